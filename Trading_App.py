@@ -1,4 +1,7 @@
+import threading
 import streamlit as st
+from pages.utils.price_store import warm_cache
+from pages.utils.forecast_scheduler import start_in_process
 
 # ------------------ Page Configuration ------------------
 st.set_page_config(
@@ -7,6 +10,18 @@ st.set_page_config(
     layout="wide"
 )
 
+# Once per server process: bulk-load the watchlist (WATCHLIST env / watchlist.txt) into the
+# local price store in the background so the first page views are local reads.
+@st.cache_resource(show_spinner=False)
+def _warm_watchlist():
+    worker = threading.Thread(target=warm_cache, daemon=True)
+    worker.start()
+    return worker
+
+_warm_watchlist()
+# After each market close the watchlist's forecasts are precomputed for the Prediction page.
+start_in_process()
+
 # ------------------ HERO SECTION ------------------
 st.markdown("""
 # 📈 Stock Time Series Analytics Platform  
@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from pages.utils import model_train, plotly_figure, indicators
+from pages.utils.model_cache import get_model_cache
+from pages.utils.model_train import (
+    get_rolling_mean, get_differencing_order, scaling, fit_model, evaluate_model, get_forecast,
+)
+from pages.utils.plotly_figure import filter_date, RSI, MACD, Moving_Average, candlestick
+from pages.utils.streaming import STREAM_WINDOW, ReplayFeed, StreamSession
+
+# Offline benchmarks for the forecasting and charting hot paths on synthetic OHLCV data.
+#   python -m benchmarks.bench_hotpaths run                 # time everything, append to history
+#   python -m benchmarks.bench_hotpaths run --sizes 250 2500 --only fit_model evaluate_model
+#   python -m benchmarks.bench_hotpaths compare             # last two runs in the history
+#   python -m benchmarks.bench_hotpaths compare -2 -1       # any two runs by position
+# Every repeat starts from cold caches (fitted models, differencing, indicators, period bounds),
+# so the numbers are what a first request for a ticker costs.
+SIZES = (250, 2_500, 25_000)
+STREAM_TICKERS = 50
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl")
+
+
+def synthetic_ohlcv(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2026-01-02", periods=n_bars, name="Date")
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.004, n_bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, n_bars)))
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Adj Close": close,
+         "Volume": rng.integers(100_000, 5_000_000, n_bars)},
+        index=index,
+    )
+
+
+def _clear_caches():
+    get_model_cache().clear()
+    model_train._differencing_cache.clear()
+    indicators._indicator_cache.clear()
+    plotly_figure._period_bounds_cache.clear()
+
+
+def _cases(frame, order):
+    # name -> (setup, call). setup runs untimed before every repeat and returns call's arguments.
+    close = frame[["Close"]]
+
+    def prepared():
+        rolling = get_rolling_mean(close)
+        d = get_differencing_order(rolling)
+        scaled, _ = scaling(rolling)
+        return scaled, d
+
+    def model_args():
+        scaled, d = prepared()
+        _clear_caches()
+        return scaled, d, "BENCH", (order[0], d, order[1])
+
+    def stream_args():
+        # One bar per ticker per step, after a full window of history has been streamed in.
+        # A step costs the same whatever the series length, so only the tail is replayed.
+        tail = frame.tail(2 * STREAM_WINDOW)
+        bars = pd.concat({f"T{i}": tail for i in range(STREAM_TICKERS)}, names=["Symbol", "Datetime"])
+        feed = ReplayFeed(bars.reset_index(), bars_per_poll=len(tail) - 1)
+        session = StreamSession(feed, feed.symbols)
+        session.step()
+        feed.bars_per_poll = 1
+        return (session,)
+
+    return {
+        "get_rolling_mean": (lambda: (close,), get_rolling_mean),
+        "get_differencing_order": (lambda: (get_rolling_mean(close),), get_differencing_order),
+        "fit_model": (model_args, fit_model),
+        "evaluate_model": (model_args, evaluate_model),
+        "get_forecast": (model_args, get_forecast),
+        "filter_date": (lambda: (frame, "1y"), filter_date),
+        "RSI": (lambda: (frame, "max"), RSI),
+        "MACD": (lambda: (frame, "max"), MACD),
+        "Moving_Average": (lambda: (frame, "max"), Moving_Average),
+        "candlestick": (lambda: (frame, "max"), candlestick),
+        "stream_step": (stream_args, StreamSession.step),
+    }
+
+
+def _measure(setup, call, repeats):
+    timings = []
+    for _ in range(repeats):
+        _clear_caches()
+        args = setup()
+        start = time.perf_counter()
+        call(*args)
+        timings.append(time.perf_counter() - start)
+
+    # Separate pass for memory: tracemalloc slows allocation-heavy code down.
+    _clear_caches()
+    args = setup()
+    tracemalloc.start()
+    try:
+        call(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_s": round(float(np.median(timings)), 6),
+        "min_s": round(float(np.min(timings)), 6),
+        "repeats": repeats,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(sizes=SIZES, only=None, repeats=5, model_repeats=1, order=(5, 5), history=HISTORY_FILE):
+    results = {}
+    for n_bars in sizes:
+        frame = synthetic_ohlcv(n_bars)
+        for name, (setup, call) in _cases(frame, order).items():
+            if only and name not in only:
+                continue
+            n = model_repeats if name in ("fit_model", "evaluate_model", "get_forecast") else repeats
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                stats = _measure(setup, call, n)
+            results[f"{name}[{n_bars}]"] = stats
+            print(f"{name:>24} {n_bars:>7} bars  {stats['median_s'] * 1000:>11.2f} ms  {stats['peak_kib']:>10.1f} KiB",
+                  flush=True)
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "arima_order": f"({order[0]}, d, {order[1]})",
+        "results": results,
+    }
+    if history:
+        with open(history, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+    return record
+
+
+def load_history(history=HISTORY_FILE):
+    if not os.path.exists(history):
+        return []
+    with open(history) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def compare(base, head):
+    print(f"base: {base['timestamp']} ({base.get('commit')})   head: {head['timestamp']} ({head.get('commit')})")
+    print(f"{'benchmark':>34} {'base ms':>11} {'head ms':>11} {'ratio':>7} {'peak KiB base/head':>22}")
+    for name in sorted(set(base["results"]) & set(head["results"])):
+        b, h = base["results"][name], head["results"][name]
+        ratio = h["median_s"] / b["median_s"] if b["median_s"] else float("nan")
+        print(f"{name:>34} {b['median_s'] * 1000:>11.2f} {h['median_s'] * 1000:>11.2f} {ratio:>6.2f}x "
+              f"{b['peak_kib']:>10.1f}/{h['peak_kib']:<10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark forecasting and charting hot paths.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="run benchmarks and append the results to the history")
+    run_p.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    run_p.add_argument("--only", nargs="+", help="benchmark names to run")
+    run_p.add_argument("--repeats", type=int, default=5)
+    run_p.add_argument("--model-repeats", type=int, default=1, help="repeats for the ARIMA fits")
+    run_p.add_argument("--order", type=int, nargs=2, default=[5, 5], metavar=("P", "Q"),
+                       help="ARIMA (p, q) for the model benchmarks; d comes from the data")
+    run_p.add_argument("--history", default=HISTORY_FILE)
+
+    cmp_p = sub.add_parser("compare", help="compare two runs from the history")
+    cmp_p.add_argument("runs", type=int, nargs="*", default=[-2, -1], help="positions in the history")
+    cmp_p.add_argument("--history", default=HISTORY_FILE)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args.sizes, args.only, args.repeats, args.model_repeats, tuple(args.order), args.history)
+        return 0
+
+    records = load_history(args.history)
+    if len(records) < 2:
+        print("need at least two runs in the history to compare", file=sys.stderr)
+        return 1
+    base, head = (records[i] for i in (args.runs + [-1])[:2])
+    compare(base, head)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
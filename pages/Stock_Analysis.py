@@ -1,9 +1,15 @@
 import streamlit as st
 import pandas as pd
 import yfinance as yf
-import plotly.graph_objects as go
 import datetime
-from pages.utils.plotly_figure import plotly_table, candlestick, RSI, MACD, line_chart, moving_average, close_chart
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeout
+from pages.utils.price_store import get_prices, normalize_ohlc
+from pages.utils.plotly_figure import plotly_table, candlestick, RSI, MACD, line_chart, moving_average, close_chart, \
+    stream_figures, extend_stream_figures
+from pages.utils.streaming import STREAM_INTERVALS, STREAM_WINDOW, STREAM_COLUMNS, StreamSession, ReplayFeed, YahooFeed
+from pages.utils.tracing import start_request, traced, render_timing_panel
 
 # setting page configuration
 st.set_page_config(
@@ -12,8 +18,82 @@ st.set_page_config(
     layout = "wide"
 )
 
+request = start_request("Stock_Analysis")
+# Serialising the figure to the browser is a separate cost from building it.
+plotly_chart = traced("st.plotly_chart")(st.plotly_chart)
+show_timings = st.sidebar.checkbox("Show timing breakdown")
+
 st.title("Stock Analysis")
 
+# Intraday streaming: one StreamSession per browser session advances every ticker's indicators
+# bar by bar; the charts of the ticker on screen are extended with the new points only.
+STREAM_REFRESH_SECONDS = 1
+STREAM_REPLAY_FILE = os.environ.get("STREAM_REPLAY_FILE", "")
+
+mode = st.sidebar.radio("Data", ("Daily", "Intraday (streaming)"))
+
+
+def _stream_fragment(func):
+    fragment = getattr(st, "fragment", None)
+    return fragment(run_every=STREAM_REFRESH_SECONDS)(func) if fragment else func
+
+
+@_stream_fragment
+def _stream_section(focus: str):
+    session = st.session_state["stream_session"]
+    updates = session.step()
+    if st.session_state.get("stream_focus") != focus:
+        st.session_state["stream_focus"] = focus
+        st.session_state["stream_figures"] = stream_figures(session.streams[focus].frame())
+    else:
+        extend_stream_figures(st.session_state["stream_figures"], updates.get(focus, []), STREAM_WINDOW, STREAM_COLUMNS)
+    figures = st.session_state["stream_figures"]
+
+    latest = session.latest()
+    if latest.empty:
+        st.info("Waiting for the first completed bars...")
+        return
+    plotly_chart(figures['price'], use_container_width=True)
+    plotly_chart(figures['rsi'], use_container_width=True)
+    plotly_chart(figures['macd'], use_container_width=True)
+    st.write("##### Latest Bar")
+    plotly_chart(plotly_table(latest.round(2)), use_container_width=True)
+
+
+if mode == "Intraday (streaming)":
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        symbols_text = st.text_input("Enter Stock Tickers (comma separated)", "AAPL, MSFT, NVDA")
+    with col2:
+        interval = st.selectbox("Interval", STREAM_INTERVALS)
+    with col3:
+        replay_file = st.text_input("Replay File (CSV/Parquet, empty for live)", STREAM_REPLAY_FILE).strip()
+
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols_text.split(",") if s.strip()))
+    stream_key = (tuple(symbols), interval, replay_file)
+    if st.session_state.get("stream_key") != stream_key:
+        try:
+            feed = ReplayFeed(replay_file) if replay_file else YahooFeed(interval)
+        except Exception as exc:
+            st.error(f"Unable to open the replay file: {exc}")
+            st.stop()
+        if replay_file:
+            # A recording only has its own tickers; stream all of them unless some were asked for.
+            symbols = [s for s in symbols if s in feed.symbols] or feed.symbols
+        st.session_state["stream_key"] = stream_key
+        st.session_state["stream_session"] = StreamSession(feed, symbols)
+        st.session_state.pop("stream_focus", None)
+
+    session = st.session_state["stream_session"]
+    if not session.streams:
+        st.warning("Please enter at least one stock ticker symbol.")
+        st.stop()
+    focus = st.selectbox("Chart", list(session.streams))
+    _stream_section(focus)
+    if show_timings:
+        render_timing_panel(request)
+    st.stop()
+
 col1, col2, col3 = st.columns(3)
 
 today = datetime.date.today()
@@ -32,8 +112,7 @@ if not tick:
     st.warning("Please enter a stock ticker symbol.")
     st.stop()
 
-stock = yf.Ticker(tick)
-
+@traced()
 def _safe_info(ticker_obj: yf.Ticker) -> dict:
     try:
         # yfinance may raise here (network/API/rate-limit) or return None
@@ -43,94 +122,18 @@ def _safe_info(ticker_obj: yf.Ticker) -> dict:
         return {}
 
 
+@traced()
 def _safe_history(symbol: str, period: str = "max") -> pd.DataFrame:
-    # Prefer yf.download: generally returns empty DF instead of crashing in scraper.
+    # Full daily history comes from the local price store, which only fetches bars
+    # newer than its last stored date; retries and backoff live in the fetch layer.
     try:
-        df = yf.download(
-            symbol,
-            period=period,
-            interval="1d",
-            auto_adjust=False,
-            actions=False,
-            progress=False,
-            threads=False,
-        )
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            return df
+        return get_prices(symbol)
     except Exception:
-        pass
-
-    # Some environments intermittently return empty for period='max'.
-    # Retry using an explicit start date.
-    if str(period).lower() == "max":
-        for start in ("1900-01-01", "1970-01-01", "2000-01-01"):
-            try:
-                df = yf.download(
-                    symbol,
-                    start=start,
-                    interval="1d",
-                    auto_adjust=False,
-                    actions=False,
-                    progress=False,
-                    threads=False,
-                )
-                if isinstance(df, pd.DataFrame) and not df.empty:
-                    return df
-            except Exception:
-                continue
-
-        # Last resort: try a smaller period.
-        try:
-            df = yf.download(
-                symbol,
-                period="10y",
-                interval="1d",
-                auto_adjust=False,
-                actions=False,
-                progress=False,
-                threads=False,
-            )
-            if isinstance(df, pd.DataFrame) and not df.empty:
-                return df
-        except Exception:
-            pass
-
-    # Fallback to Ticker.history (can still fail on Yahoo payload issues)
-    try:
-        df = yf.Ticker(symbol).history(period=period)
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            return df
-    except Exception:
-        pass
-
-    return pd.DataFrame()
-
-
-def _normalize_ohlc(df: pd.DataFrame) -> pd.DataFrame:
-    # yfinance can return MultiIndex columns even for a single ticker.
-    # For this app we expect simple columns: Open/High/Low/Close/Volume.
-    if not isinstance(df, pd.DataFrame) or df.empty:
         return pd.DataFrame()
 
-    if isinstance(df.columns, pd.MultiIndex):
-        # Common case: level0 = [Open, High, Low, Close, Volume], level1 = [<ticker>]
-        # If only one ticker present, drop the ticker level.
-        if df.columns.nlevels >= 2:
-            level_1_vals = df.columns.get_level_values(-1)
-            if len(set(map(str, level_1_vals))) == 1:
-                df = df.copy()
-                df.columns = df.columns.get_level_values(0)
-            else:
-                # Multiple tickers: keep only the selected symbol if present.
-                try:
-                    df = df.xs(tick, axis=1, level=-1, drop_level=True)
-                except Exception:
-                    return pd.DataFrame()
-
-    # Some yfinance outputs use lowercase or include 'Adj Close'; standardize minimally.
-    rename_map = {c: str(c).title() for c in df.columns}
-    df = df.rename(columns=rename_map)
-    return df
+
+def _normalize_ohlc(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    return normalize_ohlc(df, symbol)
 
 
 def _get_close_scalar(df: pd.DataFrame, idx: int) -> float | None:
@@ -147,24 +150,31 @@ def _get_close_scalar(df: pd.DataFrame, idx: int) -> float | None:
     except Exception:
         return None
 
-info = _safe_info(stock)
-summary = info.get("longBusinessSummary")
-if summary:
-    st.write(summary)
 
-if info:
-    if info.get("sector") is not None:
-        st.write("**Sector:**", info.get("sector"))
-    if info.get("fullTimeEmployees") is not None:
-        st.write("**Full Time Employees:**", info.get("fullTimeEmployees"))
-    if info.get("website") is not None:
-        st.write("**Website:**", info.get("website"))
-else:
-    st.info("Unable to load company profile (Yahoo Finance may be rate-limiting or the ticker is invalid).")
+# Everything below the inputs is cached per ticker so widget clicks don't refetch or rebuild it.
+# The chart section is a fragment: period/indicator changes rerun only that section.
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False)
+def _load_info(symbol: str) -> dict:
+    return _safe_info(yf.Ticker(symbol))
 
-col1, col2 = st.columns(2)
 
-with col1:
+# Not st.cache_data: that would keep a pickled float64 copy per ticker and unpickle another on
+# every rerun. The price store already serves compact read-only views from memory.
+def _load_history(symbol: str) -> pd.DataFrame:
+    return _normalize_ohlc(_safe_history(symbol, period='max'), symbol)
+
+
+# The table and the Daily Change metric print prices, so they read the stored float64 values
+# rather than the float32 history the charts are drawn from.
+def _load_range(symbol: str, start, end) -> pd.DataFrame:
+    try:
+        return _normalize_ohlc(get_prices(symbol, start, end, precise=True), symbol)
+    except Exception:
+        return pd.DataFrame()
+
+
+@st.cache_data(ttl=6 * 60 * 60, show_spinner=False)
+def _fundamentals_tables(symbol: str, info: dict):
     df = pd.DataFrame(index = ['Market Cap', 'Beta', 'EPS', 'PE Ration', 'avg Volume'])
     df[''] = [
         info.get('marketCap'),
@@ -173,10 +183,8 @@ with col1:
         info.get('trailingPE'),
         info.get('averageVolume'),
     ]
-    fig_df = plotly_table(df)
-    st.plotly_chart(fig_df, use_container_width=True)
+    valuation = plotly_table(df)
 
-with col2:
     df = pd.DataFrame(index = ['Quick Ratio','Revenue per Share','Profit Margin','Return on Equity','Debt to Equity'])
     df[''] = [
         info.get('quickRatio'),
@@ -185,20 +193,114 @@ with col2:
         info.get('returnOnEquity'),
         info.get('debtToEquity'),
     ]
-    fig_df = plotly_table(df)
-    st.plotly_chart(fig_df, use_container_width=True)
-
-data = yf.download(
-    tick,
-    start=start_date,
-    end=end_date,
-    auto_adjust=False,
-    actions=False,
-    progress=False,
-    threads=False,
-)
+    return valuation, plotly_table(df)
+
+
+# Profile and price history are independent network calls: both are started up front and each
+# part of the page renders as soon as its own call returns. A call that runs past its timeout is
+# left to finish in the background (filling the cache for the next rerun) instead of blocking the page.
+INFO_TIMEOUT = 15
+HISTORY_TIMEOUT = 30
+
+
+@st.cache_resource(show_spinner=False)
+def _fetch_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="analysis-fetch")
+
 
-data = _normalize_ohlc(data)
+def _submit(func, *args):
+    # copy_context keeps the worker's spans on this page run's timing breakdown.
+    return _fetch_pool().submit(contextvars.copy_context().run, func, *args)
+
+
+def _result(future, timeout: float):
+    try:
+        return future.result(timeout=timeout)
+    except FetchTimeout:
+        return None
+
+
+# st.fragment landed in Streamlit 1.37; older versions just rerun the whole page.
+_fragment = getattr(st, "fragment", None) or (lambda func: func)
+
+PERIOD_BUTTONS = (("5D", '5d'), ("1M", '1mo'), ("3M", '3mo'), ("6M", '6mo'), ("YTD", 'ytd'), ("1Y", '1y'), ("MAX", 'max'))
+
+
+@_fragment
+def _chart_section(symbol: str, history: pd.DataFrame):
+    # Remember the selected period per ticker so switching indicators doesn't reset it.
+    period_key = f"analysis_period_{symbol}"
+    columns = st.columns([1,1,1,1,1,1,1,1,1,1,1,1])
+    for column, (label, period) in zip(columns, PERIOD_BUTTONS):
+        with column:
+            if st.button(label):
+                st.session_state[period_key] = period
+    num_period = st.session_state.get(period_key, '1y')
+
+    col1, col2, col3 = st.columns([1,1,4])
+    with col1:
+        chart_type = st.selectbox('',('Candle','Line'))
+    with col2:
+        if chart_type == 'Candle':
+            indicators = st.selectbox('',('RSI', 'MACD'))
+        else:
+            indicators = st.selectbox('',('RSI', 'Moving Average', 'MACD'))
+
+    if chart_type == 'Candle':
+        plotly_chart(candlestick(history, num_period), use_container_width=True)
+    elif indicators == 'Moving Average':
+        plotly_chart(line_chart(history, num_period), use_container_width=True)
+    else:
+        plotly_chart(close_chart(history, num_period), use_container_width=True)
+
+    if indicators == 'RSI':
+        plotly_chart(RSI(history, num_period), use_container_width=True)
+    elif indicators == 'MACD':
+        plotly_chart(MACD(history, num_period), use_container_width=True)
+    else:
+        plotly_chart(moving_average(history, num_period), use_container_width=True)
+
+
+info_future = _submit(_load_info, tick)
+history_future = _submit(_load_history, tick)
+
+info = _result(info_future, INFO_TIMEOUT)
+if info is None:
+    st.info("Company profile is taking longer than usual; it will show on the next refresh.")
+    info = {}
+summary = info.get("longBusinessSummary")
+if summary:
+    st.write(summary)
+
+if info:
+    if info.get("sector") is not None:
+        st.write("**Sector:**", info.get("sector"))
+    if info.get("fullTimeEmployees") is not None:
+        st.write("**Full Time Employees:**", info.get("fullTimeEmployees"))
+    if info.get("website") is not None:
+        st.write("**Website:**", info.get("website"))
+elif info_future.done():
+    st.info("Unable to load company profile (Yahoo Finance may be rate-limiting or the ticker is invalid).")
+
+if info_future.done():
+    valuation_table, ratios_table = _fundamentals_tables(tick, info)
+    col1, col2 = st.columns(2)
+
+    with col1:
+        plotly_chart(valuation_table, use_container_width=True)
+
+    with col2:
+        plotly_chart(ratios_table, use_container_width=True)
+
+history = _result(history_future, HISTORY_TIMEOUT)
+if history is None:
+    st.warning("Price history is still loading; refresh the page in a moment.")
+    st.stop()
+
+# The selected date range (yf.download semantics: end is exclusive), read at full precision.
+data = history
+if not history.empty:
+    data = _load_range(tick, start_date, end_date)
 
 if not isinstance(data, pd.DataFrame) or data.empty:
     st.error("No price data returned for the selected date range. Check the ticker symbol and try again.")
@@ -220,91 +322,9 @@ last_10_days = data.tail(10).sort_index(ascending=False).round(3)
 fig_df = plotly_table(last_10_days)
 
 st.write("##### Historical Data (Last 10 Days)")
-st.plotly_chart(fig_df, use_container_width=True)
+plotly_chart(fig_df, use_container_width=True)
 
-col1, col2, col3, col4, col5, col6, col7, col8, col9, col10, col11, col12 = st.columns([1,1,1,1,1,1,1,1,1,1,1,1])
-num_period = ''
-with col1:
-    if st.button("5D"):
-        num_period = '5d'
-with col2:
-    if st.button("1M"):
-        num_period = '1mo'
-with col3:
-    if st.button("3M"):
-        num_period = '3mo'
-with col4:
-    if st.button("6M"):
-        num_period = '6mo'
-with col5:
-    if st.button("YTD"):
-        num_period = 'ytd'
-with col6:
-    if st.button("1Y"):
-        num_period = '1y'
-with col7:
-    if st.button("MAX"):
-        num_period = 'max'
-
-col1, col2, col3 = st.columns([1,1,4])
-with col1:
-    chart_type = st.selectbox('',('Candle','Line'))
-with col2:
-    if chart_type == 'Candle':
-        indicators = st.selectbox('',('RSI', 'MACD'))
-    else:
-        indicators = st.selectbox('',('RSI', 'Moving Average', 'MACD'))
-
-data1 = _normalize_ohlc(_safe_history(tick, period='max'))
-new_df1 = data1
-
-if data1.empty:
-    st.warning(
-        "Unable to load full historical history (MAX) from Yahoo Finance right now. "
-        "Showing charts using the selected date range instead."
-    )
-    data1 = data.copy()
-    new_df1 = data1
-if num_period == '':
-
-    if chart_type == 'Candle' and indicators == 'RSI':
-       st.plotly_chart(candlestick(data1, '1y'), use_container_width=True)
-       st.plotly_chart(RSI(data1, '1y'), use_container_width=True)
-    
-    if chart_type == 'Candle' and indicators == 'MACD':
-       st.plotly_chart(candlestick(data1, '1y'), use_container_width=True)
-       st.plotly_chart(MACD(data1, '1y'), use_container_width=True)
-
-    if chart_type == 'Line' and indicators == 'RSI':
-       st.plotly_chart(line_chart(data1, '1y'), use_container_width=True)
-       st.plotly_chart(RSI(data1, '1y'), use_container_width=True)
-    
-    if chart_type == 'Line' and indicators == 'Moving Average':
-       st.plotly_chart(line_chart(data1, '1y'), use_container_width=True)
-       st.plotly_chart(moving_average(data1, '1y'), use_container_width=True)
-    
-    if chart_type == 'Line' and indicators == 'MACD':
-       st.plotly_chart(line_chart(data1, '1y'), use_container_width=True)
-       st.plotly_chart(MACD(data1, '1y'), use_container_width=True)
-
-else:
+_chart_section(tick, history)
 
-    if chart_type == 'Candle' and indicators == 'RSI':
-       st.plotly_chart(candlestick(new_df1, num_period), use_container_width=True)
-       st.plotly_chart(RSI(new_df1, num_period), use_container_width=True)
-
-    if chart_type == 'Candle' and indicators == 'MACD':
-       st.plotly_chart(candlestick(new_df1, num_period), use_container_width=True)
-       st.plotly_chart(MACD(new_df1, num_period), use_container_width=True)
-    
-    if chart_type == 'Line' and indicators == 'RSI':
-       st.plotly_chart(close_chart(new_df1, num_period), use_container_width=True)
-       st.plotly_chart(RSI(new_df1, num_period), use_container_width=True)
-    
-    if chart_type == 'Line' and indicators == 'Moving Average':
-       st.plotly_chart(line_chart(new_df1, num_period), use_container_width=True)
-       st.plotly_chart(moving_average(new_df1, num_period), use_container_width=True)
-    
-    if chart_type == 'Line' and indicators == 'MACD':
-       st.plotly_chart(close_chart(new_df1, num_period), use_container_width=True)
-       st.plotly_chart(MACD(new_df1, num_period), use_container_width=True)
\ No newline at end of file
+if show_timings:
+    render_timing_panel(request)
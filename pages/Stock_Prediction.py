@@ -1,7 +1,16 @@
 import streamlit as st
 from pages.utils.model_train import get_data, get_forecast, get_rolling_mean, get_differencing_order, inverse_scaling, scaling, evaluate_model
+from pages.utils.model_train import compare_engines, engine_order, FORECAST_ENGINES, ENGINE_RMSE_TOLERANCE
+from pages.utils.model_train import simulate_forecast, simulate_results, INTERVAL_LEVELS, SIMULATION_PATHS
+from pages.utils.forecast_updater import update_forecast
+from pages.utils.forecast_store import load_forecast, forecast_to_frame, forecast_age
 import pandas as pd
-from pages.utils.plotly_figure import plotly_table, moving_average_forecast
+import numpy as np
+from pages.utils.order_search import select_order
+from pages.utils.backtest import backtest, BACKTEST_MODES, MIN_TRAIN
+from pages.utils.plotly_figure import plotly_table, moving_average_forecast, forecast_comparison
+from pages.utils.forecast_compare import compare_forecasts, HORIZONS
+from pages.utils.tracing import start_request, traced, render_timing_panel
 
 st.set_page_config(
 
@@ -10,34 +19,179 @@ st.set_page_config(
     layout= "wide"
 )
 
+request = start_request("Stock_Prediction")
+# Serialising the figure to the browser is a separate cost from building it.
+plotly_chart = traced("st.plotly_chart")(st.plotly_chart)
+show_timings = st.sidebar.checkbox("Show timing breakdown")
+
 st.title("Stock Prediction")
 
+mode = st.sidebar.radio("Mode", ("Single ticker", "Compare tickers"))
+
+
+@st.cache_data(ttl=60 * 60, show_spinner="Forecasting...")
+def _comparison(tickers, horizons, engine):
+    return compare_forecasts(tickers, horizons, order_mode="fixed", engine=engine)
+
+
+if mode == "Compare tickers":
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        tickers = st.text_input("Tickers (comma separated)", "AAPL, MSFT, GOOGL")
+    with col2:
+        horizons = st.multiselect("Horizons (trading days)", HORIZONS, default=list(HORIZONS))
+    with col3:
+        compare_engine = st.selectbox("Forecasting Engine", FORECAST_ENGINES, index=FORECAST_ENGINES.index("state_space"))
+
+    symbols = tuple(dict.fromkeys(t.strip().upper() for t in tickers.split(",") if t.strip()))
+    if not symbols or not horizons:
+        st.warning("Enter at least one ticker and pick at least one horizon.")
+        st.stop()
+
+    comparison = _comparison(symbols, tuple(sorted(horizons)), compare_engine)
+    st.write(f"**{len(comparison['table'])} tickers forecast in {comparison['total_seconds']}s** "
+             f"(one fit and one {max(horizons)}-day forecast per ticker)")
+    for symbol, error in comparison['errors'].items():
+        st.warning(f"{symbol}: {error}")
+    if not comparison['table'].empty:
+        plotly_chart(plotly_table(comparison['table']), use_container_width=True)
+        plotly_chart(forecast_comparison(comparison['paths'], comparison['horizons']), use_container_width=True)
+
+    if show_timings:
+        render_timing_panel(request)
+    st.stop()
+
 col1, col2, col3 = st.columns(3)
 
 with col1:
     ticker = st.text_input("Enter Stock Ticker", "AAPL")
+with col2:
+    order_mode = st.selectbox("ARIMA Order", ("Auto (AIC)", "Auto (BIC)", "Fixed (30, d, 30)"))
+with col3:
+    fastest = f"Fastest within {ENGINE_RMSE_TOLERANCE:.0%} RMSE"
+    engine_choice = st.selectbox("Forecasting Engine", (fastest,) + FORECAST_ENGINES)
 
 rmse = 0
 
 st.subheader('Predicting Next 30 Days Close Price For: ' + ticker)
 
+# Watchlist tickers are materialized by the forecast scheduler after the close; anything else
+# (or any other order/engine setting) is computed on demand below.
+order_key = {"Auto (AIC)": "aic", "Auto (BIC)": "bic"}.get(order_mode, "fixed")
+materialized = load_forecast(ticker, order_key, "fastest" if engine_choice == fastest else engine_choice)
+
 close_price = get_data(ticker)
 rolling_price = get_rolling_mean(close_price)
 
 differencing_order = get_differencing_order(rolling_price)
 scaled_data, scaler = scaling(rolling_price)
-rmse = evaluate_model(scaled_data, differencing_order)
 
-st.write("**Model RMSE:**", rmse)
+order = None
+if materialized is not None:
+    order, engine, rmse = tuple(materialized["order"]), materialized["engine"], materialized["rmse"]
+    if order_mode.startswith("Auto"):
+        st.write("**ARIMA Order:**", order)
+elif order_mode.startswith("Auto"):
+    # Score the grid on the training window only so the holdout RMSE stays honest.
+    selection = select_order(scaled_data[:-30], differencing_order, criterion=order_mode[6:9].lower())
+    order = selection["order"]
+    st.write(
+        "**ARIMA Order:**", order,
+        f"({selection['candidates_fitted']}/{selection['grid_size']} candidates, {selection['total_seconds']}s)",
+    )
+
+if materialized is None:
+    if engine_choice == fastest:
+        comparison = compare_engines(scaled_data, differencing_order, ticker, order)
+        engine = comparison["engine"]
+        rmse = comparison["table"].loc[engine, "rmse"]
+    else:
+        engine = engine_choice
+        rmse = evaluate_model(scaled_data, differencing_order, ticker, order, engine)
+
+st.write("**Engine:**", engine, "  **Model RMSE:**", rmse)
 
-forecast = get_forecast(scaled_data, differencing_order)
+if materialized is None and engine_choice == fastest:
+    with st.expander("Engine latency vs accuracy"):
+        plotly_chart(plotly_table(comparison["table"]), use_container_width=True)
 
-forecast['Close'] = inverse_scaling(scaler, forecast['Close'])
+with st.expander("Walk-forward backtest"):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        bt_folds = st.slider("Folds", 2, 10, 5)
+    with col2:
+        bt_horizon = st.slider("Horizon (days)", 5, 60, 30)
+    with col3:
+        bt_mode = st.selectbox("Fold fitting", BACKTEST_MODES)
+    if st.button("Run backtest"):
+        try:
+            result = backtest(scaled_data, differencing_order, order, folds=bt_folds, horizon=bt_horizon,
+                              mode=bt_mode, scaler=scaler, ticker=ticker, engine=engine)
+        except ValueError as exc:
+            st.warning(str(exc))
+        else:
+            st.write(
+                f"**Engine:** {result['engine']} ({result['mode']})   "
+                f"**Mean RMSE:** {result['rmse_mean']} (± {result['rmse_std']})   "
+                f"**Mean MAPE:** {result['mape_mean']}%   "
+                f"**Time:** {result['total_seconds']}s (base fit {result['base_fit_seconds']}s)"
+            )
+            if len(result['folds']) < result['folds_requested']:
+                st.info(f"Ran {len(result['folds'])} of {result['folds_requested']} folds: the earlier ones "
+                        f"would have trained on fewer than {MIN_TRAIN} days.")
+            plotly_chart(plotly_table(result['folds']), use_container_width=True)
+
+forecast_order = engine_order(engine, differencing_order, order)
+if materialized is not None:
+    forecast = forecast_to_frame(materialized)
+    age_hours = forecast_age(materialized).total_seconds() / 3600
+    st.caption(
+        f"Precomputed {age_hours:.1f}h ago on data through {materialized['data_through']}"
+        + (" (newer bars have arrived since)"
+           if close_price.index[-1].strftime('%Y-%m-%d') > materialized['data_through'] else "")
+    )
+elif forecast_order is not None:
+    # Reuses the fitted model from earlier reruns and only folds in bars that arrived since.
+    update = update_forecast(ticker, close_price, forecast_order, levels=INTERVAL_LEVELS)
+    forecast = update['forecast']
+    st.caption(
+        f"Forecast {update['mode']}"
+        + (f" ({update['refit_reason']})" if update['refit_reason'] else "")
+        + f" in {update['seconds']}s; model fitted {update['fitted_at']:%Y-%m-%d %H:%M} on {update['observations']} days"
+    )
+else:
+    forecast = get_forecast(scaled_data, differencing_order, ticker, order, engine, levels=INTERVAL_LEVELS)
+    for column in forecast.columns:
+        forecast[column] = inverse_scaling(scaler, forecast[column])
 st.write('##### Forecast Data (Next 30 Days)')
 fig_tail = plotly_table(forecast.sort_index(ascending=True).round(3))
-st.plotly_chart(fig_tail, use_container_width=True)
+plotly_chart(fig_tail, use_container_width=True)
 
 
 forecast = pd.concat([rolling_price, forecast])
 
-st.plotly_chart(moving_average_forecast(forecast.iloc[150:]), use_container_width=True)
\ No newline at end of file
+plotly_chart(moving_average_forecast(forecast.iloc[150:]), use_container_width=True)
+
+with st.expander("Monte-Carlo simulation"):
+    n_paths = st.select_slider("Paths", (100, 1000, 5000, 10000), value=SIMULATION_PATHS)
+    if st.checkbox("Simulate forecast paths"):
+        # Simulated from the model the forecast above came from, then mapped to prices. A precomputed
+        # forecast's model lives in the scheduler, so that case fits (and caches) one here.
+        if materialized is None and forecast_order is not None:
+            paths = simulate_results(update['results'], ticker, n_paths=n_paths)
+            paths_scaler = update['scaler']
+        else:
+            paths = simulate_forecast(scaled_data, differencing_order, ticker, order, engine, n_paths=n_paths)
+            paths_scaler = scaler
+        prices = paths * paths_scaler.scale_[0] + paths_scaler.mean_[0]
+        days = [d for d in (5, 10, 20, 30) if d <= prices.shape[1]]
+        quantiles = np.percentile(prices[:, np.array(days) - 1], [5, 50, 95], axis=0)
+        st.write(
+            f"**Chance of ending above the current level ({rolling_price['Close'].iloc[-1]:.2f}):** "
+            f"{np.mean(prices[:, -1] > rolling_price['Close'].iloc[-1]):.0%} of {n_paths} paths"
+        )
+        table = pd.DataFrame(quantiles.round(2), index=['5th pct', 'Median', '95th pct'], columns=[f"{d}d" for d in days])
+        plotly_chart(plotly_table(table), use_container_width=True)
+
+if show_timings:
+    render_timing_panel(request)
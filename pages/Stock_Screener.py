@@ -0,0 +1,67 @@
+import streamlit as st
+from pages.utils.price_store import load_watchlist, refresh_many
+from pages.utils.screener import screen, FIELDS, FUNCTIONS
+from pages.utils.plotly_figure import plotly_table
+from pages.utils.tracing import start_request, traced, render_timing_panel
+
+st.set_page_config(
+    page_title = "Stock Screener",
+    page_icon = "mag",
+    layout = "wide"
+)
+
+request = start_request("Stock_Screener")
+# Serialising the figure to the browser is a separate cost from building it.
+plotly_chart = traced("st.plotly_chart")(st.plotly_chart)
+show_timings = st.sidebar.checkbox("Show timing breakdown")
+
+st.title("Stock Screener")
+
+EXAMPLES = (
+    "RSI < 30 and close > SMA_50",
+    "crossed_above(MACD, signal)",
+    "crossed_below(close, SMA_50)",
+    "RSI > 70 or histogram < 0",
+)
+
+DEFAULT_UNIVERSE = "AAPL, MSFT, GOOGL, AMZN, TSLA"
+
+universe_text = st.text_area("Universe (comma or newline separated)", ", ".join(load_watchlist()) or DEFAULT_UNIVERSE)
+col1, col2 = st.columns([4, 1])
+with col1:
+    condition = st.text_input("Condition", EXAMPLES[0])
+with col2:
+    within = st.number_input("Within last sessions", min_value=1, max_value=60, value=1)
+st.caption(f"Fields: {', '.join(sorted(FIELDS))}. Functions: {', '.join(FUNCTIONS)}. "
+           f"Combine with and / or / not. Examples: {' · '.join(EXAMPLES)}")
+
+symbols = list(dict.fromkeys(s.strip().upper() for s in universe_text.replace("\n", ",").split(",") if s.strip()))
+if not symbols:
+    st.warning("Please enter at least one stock ticker symbol.")
+    st.stop()
+
+# The screener only reads stored prices; new bars come in through one batched refresh.
+if st.button("Refresh prices"):
+    with st.spinner(f"Refreshing {len(symbols)} tickers..."):
+        refresh_many(symbols)
+
+try:
+    result = screen(condition, symbols, within=within)
+except ValueError as exc:
+    st.error(str(exc))
+    st.stop()
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Matches", f"{len(result['table'])} / {result['universe']}")
+col2.metric("As Of", str(result['as_of']) if result['as_of'] else "N/A")
+col3.metric("Screen Time", f"{result['seconds'] * 1000:.0f} ms")
+
+if result['missing']:
+    st.info(f"No stored prices yet for {len(result['missing'])} tickers ({', '.join(result['missing'][:10])}"
+            f"{', ...' if len(result['missing']) > 10 else ''}); use Refresh prices to load them.")
+
+if not result['table'].empty:
+    plotly_chart(plotly_table(result['table'].round(2)), use_container_width=True)
+
+if show_timings:
+    render_timing_panel(request)
@@ -0,0 +1,116 @@
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.arima.model import ARIMA
+
+from pages.utils.model_train import _fit_arima, _engine_fit, engine_order, FORECAST_ENGINES
+from pages.utils.tracing import traced
+from pages.utils.workers import WorkerPool
+
+# Rolling-origin (walk-forward) backtest. The model is estimated once, on the data before the
+# first origin; every fold then starts from those parameters, so the folds are independent of
+# each other and run in parallel:
+#   "filter" - keep the parameters and only run the Kalman filter over the longer history
+#              (what ARIMAResults.append(..., refit=False) does); no optimisation at all
+#   "warm"   - re-estimate on the fold's history, starting the optimiser at the base parameters
+#   "refit"  - re-estimate from scratch (slow; the reference the other two approximate)
+# Engines without an ARIMA order (ets, linear_ar) fit in milliseconds and always refit per fold.
+BACKTEST_MODES = ("filter", "warm", "refit")
+# Shortest training window a fold may have.
+MIN_TRAIN = 60
+
+
+def fold_origins(n_obs, folds, horizon, step=None, min_train=MIN_TRAIN):
+    # Training-window ends for each fold; the last fold's test window ends at the last observation.
+    # Folds that would train on fewer than `min_train` points are dropped (the earliest ones);
+    # backtest() reports how many actually ran.
+    step = step or horizon
+    origins = [n_obs - horizon - step * (folds - 1 - i) for i in range(folds)]
+    origins = [o for o in origins if o >= min_train]
+    if not origins:
+        raise ValueError(f"not enough data for {folds} folds of {horizon} steps (n={n_obs})")
+    return origins
+
+
+def _run_fold(series, order, origin, horizon, params, mode, engine="arima", differencing_order=0):
+    started = time.perf_counter()
+    train = series[:origin]
+    if order is None:
+        results = _engine_fit(train, differencing_order, engine=engine)[1]()
+        forecast = np.asarray(results.forecast(steps=horizon))
+        return origin, forecast, time.perf_counter() - started
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = ARIMA(train, order=order)
+        if mode == "filter":
+            results = model.filter(params)
+        elif mode == "warm":
+            results = model.fit(start_params=params)
+        else:
+            results = model.fit()
+    forecast = np.asarray(results.forecast(steps=horizon))
+    return origin, forecast, time.perf_counter() - started
+
+
+@traced()
+def backtest(series, differencing_order, order=None, folds=5, horizon=30, step=None, mode="filter",
+             scaler=None, ticker="", max_workers=None, engine="arima"):
+    # Backtests `engine` with the order it forecasts with (engine_order), like get_forecast.
+    if mode not in BACKTEST_MODES:
+        raise ValueError(f"mode must be one of {BACKTEST_MODES}, got {mode!r}")
+    if engine not in FORECAST_ENGINES:
+        raise ValueError(f"engine must be one of {FORECAST_ENGINES}, got {engine!r}")
+    series = np.asarray(series, dtype=np.float64).ravel()
+    order = engine_order(engine, differencing_order, order)
+    origins = fold_origins(len(series), folds, horizon, step)
+
+    started = time.perf_counter()
+    params = None
+    if order is None:
+        mode = "refit"
+    else:
+        # The base fit goes through the shared model cache, like evaluate_model/get_forecast.
+        base = _fit_arima(series[:origins[0]], order, ticker)
+        params = np.asarray(base.params)
+    base_seconds = time.perf_counter() - started
+
+    rows = []
+    with WorkerPool(max_workers=max_workers or min(len(origins), os.cpu_count() or 1)) as pool:
+        jobs = [pool.submit(_run_fold, series, order, o, horizon, params, mode, engine, differencing_order)
+                for o in origins]
+        for fold, job in enumerate(jobs, start=1):
+            origin, forecast, seconds = job.result()
+            actual = series[origin:origin + horizon]
+            rmse = float(np.sqrt(np.mean((actual - forecast) ** 2)))
+            # MAPE is only meaningful in price units, so undo the scaling when we can.
+            if scaler is not None:
+                actual_price = scaler.inverse_transform(actual.reshape(-1, 1)).ravel()
+                forecast_price = scaler.inverse_transform(forecast.reshape(-1, 1)).ravel()
+            else:
+                actual_price, forecast_price = actual, forecast
+            mape = float(np.mean(np.abs((actual_price - forecast_price) / actual_price)) * 100)
+            rows.append({
+                "fold": fold,
+                "train_size": origin,
+                "rmse": round(rmse, 4),
+                "mape_pct": round(mape, 3),
+                "fit_seconds": round(seconds, 3),
+            })
+
+    folds_df = pd.DataFrame(rows).set_index("fold")
+    return {
+        "engine": engine,
+        "order": order,
+        "mode": mode,
+        "horizon": horizon,
+        "folds": folds_df,
+        "folds_requested": folds,
+        "rmse_mean": round(float(folds_df["rmse"].mean()), 4),
+        "rmse_std": round(float(folds_df["rmse"].std(ddof=0)), 4),
+        "mape_mean": round(float(folds_df["mape_pct"].mean()), 3),
+        "base_fit_seconds": round(base_seconds, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
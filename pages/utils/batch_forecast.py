@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from pages.utils.model_train import (
+    get_data, get_rolling_mean, get_differencing_order, scaling, evaluate_and_forecast, inverse_scaling,
+    compare_engines, FORECAST_ENGINES, INTERVAL_LEVELS,
+)
+from pages.utils.order_search import select_order
+from pages.utils.workers import worker_context
+
+# Nightly batch forecasting over a ticker universe:
+#   python -m pages.utils.batch_forecast AAPL MSFT --tickers-file universe.txt --out forecasts.jsonl
+# Every ticker runs in its own worker process (at most `workers` at a time) so a hung
+# or crashing fit can be killed at its timeout without taking the rest of the batch down.
+ORDER_MODES = ("aic", "bic", "fixed")
+# "fastest" runs compare_engines and forecasts with its pick, like the Prediction page's default.
+ENGINE_MODES = ("fastest",) + FORECAST_ENGINES
+
+
+def run_pipeline(ticker, order_mode="aic", engine="arima", steps=30):
+    started = time.perf_counter()
+    close_price = get_data(ticker)
+    if close_price.empty or len(close_price) < 60:
+        raise ValueError(f"not enough price history for {ticker!r}")
+    rolling_price = get_rolling_mean(close_price)
+    differencing_order = get_differencing_order(rolling_price)
+    scaled_data, scaler = scaling(rolling_price)
+
+    fit_started = time.perf_counter()
+    order = None
+    if order_mode != "fixed":
+        # One core per ticker: the batch already parallelises across tickers.
+        order = select_order(scaled_data[:-30], differencing_order, criterion=order_mode, max_workers=1)["order"]
+    engine_mode = engine
+    if engine == "fastest":
+        comparison = compare_engines(scaled_data, differencing_order, ticker, order)
+        engine = comparison["engine"]
+    # One estimated model per ticker: the holdout fit that is scored also makes the forecast.
+    rmse, forecast = evaluate_and_forecast(scaled_data, differencing_order, ticker, order, engine, steps,
+                                           levels=INTERVAL_LEVELS)
+    fit_seconds = time.perf_counter() - fit_started
+
+    for column in forecast.columns:
+        forecast[column] = inverse_scaling(scaler, forecast[column])
+    return {
+        "ticker": ticker,
+        "status": "ok",
+        "order_mode": order_mode,
+        "engine_mode": engine_mode,
+        "engine": engine,
+        "rmse": float(rmse),
+        "differencing_order": int(differencing_order),
+        "order": list(order) if order is not None else [30, int(differencing_order), 30],
+        "data_through": close_price.index[-1].strftime('%Y-%m-%d'),
+        "last_close": round(float(close_price['Close'].iloc[-1]), 4),
+        # The models forecast the 7-day rolling mean; this is the value the forecast continues from.
+        "last_mean": round(float(rolling_price['Close'].iloc[-1]), 4),
+        "forecast": {d.strftime('%Y-%m-%d'): round(float(v), 4) for d, v in forecast['Close'].items()},
+        "intervals": {c: [round(float(v), 4) for v in forecast[c]] for c in forecast.columns if c != 'Close'},
+        "fit_seconds": round(fit_seconds, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _worker(conn, ticker, order_mode, engine):
+    if hasattr(os, "setpgrp"):
+        # Own process group, so a timeout also takes down the order-search pool it spawns.
+        os.setpgrp()
+    try:
+        result = run_pipeline(ticker, order_mode, engine)
+    except Exception as exc:
+        result = {"ticker": ticker, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    try:
+        conn.send(result)
+    finally:
+        conn.close()
+
+
+def _kill(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        proc.terminate()
+    proc.join()
+
+
+def summarize(results, elapsed):
+    ok = [r for r in results if r["status"] == "ok"]
+    fit_times = np.array([r["fit_seconds"] for r in ok]) if ok else np.array([np.nan])
+    return {
+        "tickers": len(results),
+        "ok": len(ok),
+        "errors": sum(r["status"] == "error" for r in results),
+        "timeouts": sum(r["status"] == "timeout" for r in results),
+        "elapsed_seconds": round(elapsed, 2),
+        "tickers_per_minute": round(len(results) / elapsed * 60, 2) if elapsed > 0 else None,
+        "fit_seconds_p50": None if not ok else round(float(np.percentile(fit_times, 50)), 3),
+        "fit_seconds_p95": None if not ok else round(float(np.percentile(fit_times, 95)), 3),
+    }
+
+
+def run_batch(tickers, workers=None, timeout=300.0, order_mode="aic", output=None, engine="arima", on_result=None):
+    # `on_result` is called with every result as it comes in (the scheduler stores them that way).
+    if order_mode not in ORDER_MODES:
+        raise ValueError(f"order_mode must be one of {ORDER_MODES}, got {order_mode!r}")
+    if engine not in ENGINE_MODES:
+        raise ValueError(f"engine must be one of {ENGINE_MODES}, got {engine!r}")
+    workers = workers or os.cpu_count() or 1
+    context = worker_context()
+    pending = deque(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    running = {}
+    results = []
+    started = time.perf_counter()
+    out = open(output, "w") if output else None
+
+    def record(result):
+        results.append(result)
+        if on_result:
+            on_result(result)
+        if out:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                ticker = pending.popleft()
+                recv_conn, send_conn = context.Pipe(duplex=False)
+                proc = context.Process(target=_worker, args=(send_conn, ticker, order_mode, engine))
+                proc.start()
+                send_conn.close()
+                running[recv_conn] = (ticker, proc, time.monotonic())
+
+            for conn in wait(list(running), timeout=0.5):
+                ticker, proc, _ = running.pop(conn)
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    result = {"ticker": ticker, "status": "error", "error": f"worker exited with code {proc.exitcode}"}
+                conn.close()
+                proc.join()
+                record(result)
+
+            now = time.monotonic()
+            for conn, (ticker, proc, proc_started) in list(running.items()):
+                if now - proc_started > timeout:
+                    _kill(proc)
+                    conn.close()
+                    del running[conn]
+                    record({"ticker": ticker, "status": "timeout", "error": f"exceeded {timeout}s"})
+    finally:
+        for conn, (_, proc, _) in running.items():
+            _kill(proc)
+            conn.close()
+        if out:
+            out.close()
+
+    return results, summarize(results, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch ARIMA forecasts for a list of tickers.")
+    parser.add_argument("tickers", nargs="*", help="ticker symbols")
+    parser.add_argument("--tickers-file", help="file with one ticker per line")
+    parser.add_argument("--out", default="forecasts.jsonl", help="JSON lines results file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-ticker timeout in seconds")
+    parser.add_argument("--order", choices=ORDER_MODES, default="aic", help="ARIMA order selection")
+    parser.add_argument("--engine", choices=ENGINE_MODES, default="arima", help="forecasting engine")
+    args = parser.parse_args(argv)
+
+    tickers = list(args.tickers)
+    if args.tickers_file:
+        with open(args.tickers_file) as fh:
+            tickers += [line.split("#")[0] for line in fh]
+    if not any(t.strip() for t in tickers):
+        parser.error("no tickers given")
+
+    _, summary = run_batch(tickers, workers=args.workers, timeout=args.timeout, order_mode=args.order,
+                           output=args.out, engine=args.engine)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
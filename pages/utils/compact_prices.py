@@ -0,0 +1,159 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Compact in-memory form of a ticker's daily history for the price store's read path:
+# float32 OHLC, the smallest integer type that holds the volumes, and a date axis that is shared
+# between tickers (most of a universe trades on the same calendar, so a ticker's dates are usually
+# the tail of an axis another ticker already holds). pandas frames are built on demand as views.
+MAX_TICKERS = int(os.environ.get("PRICE_CACHE_MAX_TICKERS", 5000))
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close")
+_MAX_AXES = 32
+
+_axes = []
+_axes_lock = threading.Lock()
+
+
+def _shared_dates(dates: np.ndarray) -> np.ndarray:
+    # Returns `dates` as a view into an already-held axis when one ends with exactly these dates.
+    n = len(dates)
+    with _axes_lock:
+        for i, axis in enumerate(_axes):
+            if axis.dtype != dates.dtype or len(axis) == 0 or axis[-1] != dates[-1]:
+                continue
+            if len(axis) >= n and np.array_equal(axis[len(axis) - n:], dates):
+                return axis[len(axis) - n:]
+            if len(axis) < n and np.array_equal(dates[n - len(axis):], axis):
+                # Longer history on the same calendar: it becomes the axis later tickers share.
+                _axes[i] = dates
+                return dates
+        _axes.insert(0, dates)
+        del _axes[_MAX_AXES:]
+    return dates
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    values.flags.writeable = False
+    return values
+
+
+def _compact_volume(volume) -> np.ndarray:
+    values = np.asarray(volume)
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return values.astype(np.float32)
+    values = values.astype(np.int64)
+    if len(values) and values.min() >= 0 and values.max() <= np.iinfo(np.uint32).max:
+        return values.astype(np.uint32)
+    return values
+
+
+class CompactPrices:
+    __slots__ = ("symbol", "dates", "columns", "volume")
+
+    def __init__(self, symbol, dates, columns, volume=None):
+        self.symbol = symbol
+        self.dates = dates
+        self.columns = columns
+        self.volume = volume
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, symbol: str = "") -> "CompactPrices":
+        dates = _read_only(np.array(pd.DatetimeIndex(df.index).tz_localize(None).values))
+        columns = {}
+        for name in PRICE_COLUMNS:
+            if name not in df.columns:
+                continue
+            values = df[name].to_numpy(dtype=np.float32)
+            # 'Adj Close' is usually identical to 'Close'; keep one array for both then.
+            if name == "Adj Close" and "Close" in columns and np.array_equal(values, columns["Close"]):
+                columns[name] = columns["Close"]
+                continue
+            columns[name] = _read_only(values)
+        volume = _read_only(_compact_volume(df["Volume"])) if "Volume" in df.columns else None
+        return cls(symbol, _shared_dates(dates), columns, volume)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def nbytes(self) -> int:
+        # Own arrays only: the date axis and aliased 'Adj Close' are counted where they are held.
+        arrays = {id(a): a.nbytes for a in self.columns.values()}
+        if self.volume is not None:
+            arrays[id(self.volume)] = self.volume.nbytes
+        return sum(arrays.values())
+
+    def _bounds(self, start, end):
+        lo = 0 if start is None else int(self.dates.searchsorted(np.datetime64(pd.Timestamp(start))))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(np.datetime64(pd.Timestamp(end))))
+        return lo, hi
+
+    def column(self, name: str, start=None, end=None):
+        # (dates, values) views of one column over [start, end), without building a DataFrame.
+        lo, hi = self._bounds(start, end)
+        values = self.volume if name == "Volume" else self.columns[name]
+        return self.dates[lo:hi], values[lo:hi]
+
+    def to_frame(self, start=None, end=None) -> pd.DataFrame:
+        # [start, end) like yf.download, as read-only float32 views: for charts, not for models.
+        lo, hi = self._bounds(start, end)
+        data = {name: values[lo:hi] for name, values in self.columns.items()}
+        if self.volume is not None:
+            data["Volume"] = self.volume[lo:hi]
+        index = pd.DatetimeIndex(self.dates[lo:hi], name="Date", copy=False)
+        return pd.DataFrame(data, index=index, copy=False)
+
+
+class PriceCache:
+    # LRU of CompactPrices keyed by symbol, each tagged with the store version it was built from.
+    def __init__(self, max_tickers=MAX_TICKERS):
+        self.max_tickers = max_tickers
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str, version):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(symbol)
+            return entry[1]
+
+    def put(self, symbol: str, version, df: pd.DataFrame) -> CompactPrices:
+        compact = CompactPrices.from_frame(df, symbol)
+        with self._lock:
+            self._entries[symbol] = (version, compact)
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_tickers:
+                self._entries.popitem(last=False)
+        return compact
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        # Resident bytes of the cached arrays vs. what the same data costs as float64 DataFrames.
+        with self._lock:
+            entries = [compact for _, compact in self._entries.values()]
+        rows = sum(len(c) for c in entries)
+        axes = {id(c.dates.base if c.dates.base is not None else c.dates): c.dates for c in entries}
+        axis_bytes = sum((a.base if a.base is not None else a).nbytes for a in axes.values())
+        frame_bytes = sum(len(c) * 8 * (len(c.columns) + 2 if c.volume is not None else len(c.columns) + 1)
+                          for c in entries)
+        return {
+            "tickers": len(entries),
+            "rows": rows,
+            "compact_bytes": sum(c.nbytes for c in entries) + axis_bytes,
+            "frame_bytes": frame_bytes,
+        }
+
+
+_price_cache = PriceCache()
+
+
+def get_price_cache() -> PriceCache:
+    return _price_cache
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Server-side downsampling for long-history charts. Plotly gets at most about one point per
+# horizontal pixel; short periods (anything under the target) are sent at full resolution.
+DEFAULT_CHART_WIDTH = 1200
+# A readable candle needs a few pixels of body, so candlesticks get fewer buckets than lines.
+PIXELS_PER_CANDLE = 4
+# Up to this many points per bucket, LTTB runs faster as a plain Python loop than with NumPy.
+PYTHON_BUCKET_POINTS = 32
+
+
+def line_target(width=DEFAULT_CHART_WIDTH):
+    return max(int(width), 3)
+
+
+def candle_target(width=DEFAULT_CHART_WIDTH):
+    return max(int(width) // PIXELS_PER_CANDLE, 1)
+
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, per bucket, the point
+    # forming the largest triangle with the previously kept point and the next bucket's mean.
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Mean of every bucket in one pass; bucket i spans [edges[i], edges[i+1]).
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    if n / threshold <= PYTHON_BUCKET_POINTS:
+        return _select_small_buckets(x, y, edges, mean_x, mean_y, threshold)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _select_small_buckets(x, y, edges, mean_x, mean_y, threshold):
+    # Same selection on plain floats: with a handful of points per bucket, NumPy's per-call
+    # overhead costs more than the arithmetic. Same expression, so the same points are kept.
+    xs, ys, mxs, mys, bounds = x.tolist(), y.tolist(), mean_x.tolist(), mean_y.tolist(), edges.tolist()
+    selected = [0] * threshold
+    selected[-1] = len(xs) - 1
+    a = 0
+    for i in range(threshold - 2):
+        xa, ya, mx, my = xs[a], ys[a], mxs[i + 1], mys[i + 1]
+        best = -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            area = abs((xa - mx) * (ys[j] - ya) - (xa - xs[j]) * (my - ya))
+            if area > best:
+                best, a = area, j
+        selected[i + 1] = a
+    return np.array(selected, dtype=np.int64)
+
+
+def lttb(index, values, threshold):
+    # Returns (index, values) reduced to `threshold` points; NaN stretches (indicator warm-up) are dropped.
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.flatnonzero(np.isfinite(values))
+    if len(finite) <= threshold:
+        return index[finite], values[finite]
+    x = index.asi8[finite] if isinstance(index, pd.DatetimeIndex) else np.asarray(index)[finite]
+    keep = finite[lttb_indices(x, values[finite], threshold)]
+    return index[keep], values[keep]
+
+
+def ohlc_buckets(dataframe, n_buckets):
+    # Aggregates consecutive bars into buckets: first Open, max High, min Low, last Close.
+    n = len(dataframe)
+    if n <= n_buckets:
+        return dataframe
+    starts = np.unique(np.linspace(0, n, n_buckets, endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], n) - 1
+    high = np.asarray(dataframe['High'], dtype=np.float64)
+    low = np.asarray(dataframe['Low'], dtype=np.float64)
+    return pd.DataFrame(
+        {
+            'Open': np.asarray(dataframe['Open'])[starts],
+            'High': np.fmax.reduceat(high, starts),
+            'Low': np.fmin.reduceat(low, starts),
+            'Close': np.asarray(dataframe['Close'])[ends],
+        },
+        index=dataframe.index[starts],
+    )
@@ -0,0 +1,296 @@
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pandas as pd
+import yfinance as yf
+
+from pages.utils.tracing import count
+
+# Single entry point for daily price downloads.
+# - concurrent callers asking for the same request share one in-flight download
+# - recent results are kept briefly so bursts of reruns don't re-download
+# - symbols that keep coming back empty are remembered for a while (negative cache); only an
+#   answer that actually arrived counts, never a request that failed
+# - failures are retried with bounded exponential backoff
+
+
+class FetchError(Exception):
+    # The source could not be reached (DNS, timeout, rate limit): says nothing about the symbol.
+    pass
+
+
+# yf.download doesn't raise on these; it logs them on the "yfinance" logger and returns an empty frame.
+_TRANSPORT_ERRORS = ("DNSError", "curl:", "Timeout", "RateLimit", "Too Many Requests", "ConnectionError", "SSLError")
+
+
+class _TransportErrorLog(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if any(marker in message for marker in _TRANSPORT_ERRORS):
+            self.messages.append(message)
+
+
+@contextmanager
+def _transport_errors():
+    handler = _TransportErrorLog()
+    logger = logging.getLogger("yfinance")
+    logger.addHandler(handler)
+    try:
+        yield handler.messages
+    finally:
+        logger.removeHandler(handler)
+
+
+def _failed(symbols, messages) -> list:
+    # Symbols named in a transport error. The logger is shared, so messages from concurrent
+    # downloads of other symbols are filtered out by name.
+    return [s for s in symbols
+            if any(re.search(rf"(?<![\w.^=-]){re.escape(s)}(?![\w.^=-])", m) for m in messages)]
+
+
+def yf_source(symbol: str, start=None, period=None) -> pd.DataFrame:
+    kwargs = {"start": start} if start is not None else {"period": period or "max"}
+    with _transport_errors() as errors:
+        df = yf.download(
+            symbol,
+            interval="1d",
+            auto_adjust=False,
+            actions=False,
+            progress=False,
+            threads=False,
+            **kwargs,
+        )
+    if (df is None or df.empty) and _failed([symbol], errors):
+        raise FetchError(errors[0])
+    return df
+
+
+def yf_source_many(symbols, start=None, period=None) -> pd.DataFrame:
+    # One batched request; yfinance fans it out over its own thread pool. Symbols whose part of
+    # the batch failed in transit are listed in the result's attrs["failed"].
+    kwargs = {"start": start} if start is not None else {"period": period or "max"}
+    symbols = list(symbols)
+    with _transport_errors() as errors:
+        stock_data = yf.download(
+            symbols,
+            interval="1d",
+            auto_adjust=False,
+            actions=False,
+            progress=False,
+            threads=True,
+            group_by="ticker",
+            **kwargs,
+        )
+    failed = _failed(symbols, errors)
+    if len(failed) == len(symbols):
+        raise FetchError(errors[0])
+    stock_data.attrs["failed"] = failed
+    return stock_data
+
+
+def split_tickers(stock_data: pd.DataFrame, symbols) -> dict:
+    # Batched downloads come back as (Ticker, Price) MultiIndex columns; each ticker's
+    # columns are contiguous, so selecting the top level hands back that block per symbol.
+    if not isinstance(stock_data, pd.DataFrame) or stock_data.empty:
+        return {}
+    if not isinstance(stock_data.columns, pd.MultiIndex):
+        return {symbols[0]: stock_data} if len(symbols) == 1 else {}
+
+    levels = [set(map(str, stock_data.columns.get_level_values(i))) for i in range(2)]
+    ticker_level = 0 if any(sym in levels[0] for sym in symbols) else 1
+    frames = {}
+    for sym in symbols:
+        if sym not in levels[ticker_level]:
+            continue
+        frame = stock_data.xs(sym, axis=1, level=ticker_level)
+        # The batch is aligned on the union of dates; drop days this ticker didn't trade.
+        frame = frame.dropna(how="all")
+        if not frame.empty:
+            frames[sym] = frame
+    return frames
+
+
+class Fetcher:
+    def __init__(self, source=yf_source, source_many=yf_source_many, max_attempts=4, base_delay=0.5, max_delay=8.0,
+                 result_ttl=60.0, negative_ttl=15 * 60.0, max_entries=256, sleep=time.sleep, clock=time.monotonic):
+        # `source(symbol, start=None, period=None) -> DataFrame` is the data source;
+        # swap in a local stand-in for tests.
+        self.source = source
+        self.source_many = source_many
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.result_ttl = result_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        # Both are {key: (expires, ...)} in insertion order, so expiry and the size cap drop the
+        # oldest entries first.
+        self._results = OrderedDict()
+        self._bad_symbols = OrderedDict()
+        self.stats = {"requests": 0, "downloads": 0, "coalesced": 0, "cache_hits": 0, "negative_hits": 0, "retries": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+        count(f"fetch_{name}")
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        # Full jitter so simultaneous sessions don't retry in lockstep.
+        return random.uniform(0, delay)
+
+    def _download(self, symbol: str, start, period):
+        # (frame, answered): `answered` is False when every attempt raised.
+        answered = False
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self._count("retries")
+                self._sleep(self._backoff(attempt - 1))
+            try:
+                self._count("downloads")
+                df = self.source(symbol, start=start, period=period)
+            except Exception:
+                continue
+            answered = True
+            if isinstance(df, pd.DataFrame) and not df.empty:
+                return df, answered
+            if start is not None:
+                # An empty incremental window just means no new bars yet.
+                return pd.DataFrame(), answered
+        return pd.DataFrame(), answered
+
+    def _insert(self, entries, key, value) -> None:
+        # Caller holds the lock. Expired entries are dropped as new ones arrive, then the oldest
+        # beyond max_entries, so a long-running app doesn't keep every symbol it ever saw.
+        entries.pop(key, None)
+        entries[key] = value
+        now = self._clock()
+        while entries:
+            oldest = next(iter(entries.values()))
+            expires = oldest[0] if isinstance(oldest, tuple) else oldest
+            if expires > now and len(entries) <= self.max_entries:
+                break
+            entries.popitem(last=False)
+
+    def is_known_bad(self, symbol: str) -> bool:
+        expires = self._bad_symbols.get(symbol.upper())
+        return expires is not None and expires > self._clock()
+
+    def fetch(self, symbol: str, start=None, period=None) -> pd.DataFrame:
+        symbol = symbol.upper()
+        start = None if start is None else str(start)
+        key = (symbol, start, None if start is not None else (period or "max"))
+
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.is_known_bad(symbol):
+                self.stats["negative_hits"] += 1
+                return pd.DataFrame()
+            cached = self._results.get(key)
+            if cached is not None and cached[0] > self._clock():
+                self.stats["cache_hits"] += 1
+                return cached[1]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            df, answered = self._download(symbol, start, key[2])
+        except BaseException as exc:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if not df.empty:
+                self._insert(self._results, key, (self._clock() + self.result_ttl, df))
+            elif start is None and answered:
+                self._insert(self._bad_symbols, symbol, self._clock() + self.negative_ttl)
+        future.set_result(df)
+        return df
+
+    def fetch_many(self, symbols, start=None, period=None) -> dict:
+        # Batched counterpart of fetch(): one request for many symbols, with the same
+        # backoff and bad-symbol bookkeeping. Returns {symbol: frame} for symbols that had data.
+        symbols = [s.upper() for s in dict.fromkeys(symbols)]
+        with self._lock:
+            self.stats["requests"] += 1
+            wanted = [s for s in symbols if not self.is_known_bad(s)]
+            self.stats["negative_hits"] += len(symbols) - len(wanted)
+        if not wanted:
+            return {}
+
+        start = None if start is None else str(start)
+        stock_data = pd.DataFrame()
+        answered = False
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self._count("retries")
+                self._sleep(self._backoff(attempt - 1))
+            try:
+                self._count("downloads")
+                stock_data = self.source_many(wanted, start=start, period=period)
+            except Exception:
+                continue
+            answered = isinstance(stock_data, pd.DataFrame)
+            if answered and (not stock_data.empty or start is not None):
+                break
+
+        frames = split_tickers(stock_data, wanted)
+        if start is None and answered:
+            # Only symbols the batch answered for; ones whose part failed in transit may be fine.
+            failed = set(stock_data.attrs.get("failed", ()))
+            with self._lock:
+                expires = self._clock() + self.negative_ttl
+                for sym in wanted:
+                    if sym not in frames and sym not in failed:
+                        self._insert(self._bad_symbols, sym, expires)
+        return frames
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._bad_symbols.clear()
+
+
+_default_fetcher = Fetcher()
+
+
+def get_fetcher() -> Fetcher:
+    return _default_fetcher
+
+
+def set_fetcher(fetcher: Fetcher) -> None:
+    global _default_fetcher
+    _default_fetcher = fetcher
+
+
+def fetch_history(symbol: str, start=None, period=None) -> pd.DataFrame:
+    return _default_fetcher.fetch(symbol, start=start, period=period)
+
+
+def fetch_histories(symbols, start=None, period=None) -> dict:
+    return _default_fetcher.fetch_many(symbols, start=start, period=period)
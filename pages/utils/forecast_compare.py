@@ -0,0 +1,63 @@
+import os
+import time
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from pages.utils.batch_forecast import run_pipeline
+from pages.utils.tracing import traced
+from pages.utils.workers import WorkerPool
+
+# Multi-ticker, multi-horizon forecasts. Each ticker gets one fitted model and one forecast of
+# max(horizons) trading days (run_pipeline, one worker process per ticker); every horizon is then
+# a column of the tickers x steps forecast matrix, so no horizon costs an extra fit.
+# The models forecast the 7-day rolling mean of the close, so changes are measured from its last
+# value ("7d Mean"), not from the last close.
+HORIZONS = (5, 10, 30, 60)
+
+
+def _forecast(ticker, order_mode, engine, steps):
+    try:
+        return run_pipeline(ticker, order_mode, engine, steps)
+    except Exception as exc:
+        return {"ticker": ticker, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+
+
+@traced()
+def compare_forecasts(tickers, horizons=HORIZONS, order_mode="fixed", engine="state_space", max_workers=None):
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    horizons = sorted({int(h) for h in horizons})
+    if not tickers or not horizons:
+        raise ValueError("need at least one ticker and one horizon")
+    steps = horizons[-1]
+
+    started = time.perf_counter()
+    with WorkerPool(max_workers=max_workers or min(len(tickers), os.cpu_count() or 1)) as pool:
+        results = list(pool.map(_forecast, tickers, repeat(order_mode), repeat(engine), repeat(steps)))
+    ok = [r for r in results if r["status"] == "ok"]
+
+    paths = np.array([list(r["forecast"].values()) for r in ok], dtype=np.float64).reshape(len(ok), steps)
+    last_close = np.array([r["last_close"] for r in ok], dtype=np.float64)
+    last_mean = np.array([r["last_mean"] for r in ok], dtype=np.float64)
+    at_horizon = paths[:, np.array(horizons) - 1]
+    change_pct = (at_horizon / last_mean[:, None] - 1) * 100
+
+    table = pd.DataFrame({"Last": last_close, "7d Mean": last_mean},
+                         index=pd.Index([r["ticker"] for r in ok], name="Ticker"))
+    for i, h in enumerate(horizons):
+        table[f"{h}d"] = at_horizon[:, i].round(2)
+        table[f"{h}d %"] = change_pct[:, i].round(2)
+    table["RMSE"] = [r["rmse"] for r in ok]
+    table["Engine"] = [r["engine"] for r in ok]
+
+    # Forecast paths as % change from each ticker's last rolling mean, one column per ticker.
+    dates = pd.DatetimeIndex(list(ok[0]["forecast"])) if ok else pd.DatetimeIndex([])
+    paths_pct = pd.DataFrame((paths / last_mean[:, None] - 1).T * 100, index=dates, columns=table.index)
+    return {
+        "table": table,
+        "paths": paths_pct,
+        "horizons": horizons,
+        "errors": {r["ticker"]: r.get("error", r["status"]) for r in results if r["status"] != "ok"},
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
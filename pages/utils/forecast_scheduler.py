@@ -0,0 +1,145 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; run one server process (or FORECAST_SCHEDULER=off) there.
+    fcntl = None
+
+from pages.utils import forecast_store
+from pages.utils.batch_forecast import run_batch, ORDER_MODES, ENGINE_MODES
+from pages.utils.forecast_store import save_forecast
+from pages.utils.price_store import load_watchlist, refresh_many
+
+# Materializes forecasts for the watchlist after the market closes, so the Prediction page can
+# serve them without fitting anything. Runs inside the Streamlit server (start_in_process, called
+# from Trading_App.py) or as a separate worker:
+#   python -m pages.utils.forecast_scheduler            # loop: run after every close
+#   python -m pages.utils.forecast_scheduler --once     # run now, then exit
+# Set FORECAST_SCHEDULER=off to keep the Streamlit server from running it in-process.
+# With several server processes on one host every one of them schedules the run, but each close
+# is claimed through a lock file next to the forecast store: the first process to take it runs
+# the job and records it, the others find it taken or done and skip it.
+MARKET_TZ = ZoneInfo(os.environ.get("FORECAST_SCHEDULE_TZ", "America/New_York"))
+RUN_AT = os.environ.get("FORECAST_SCHEDULE_TIME", "16:30")
+ORDER_MODE = os.environ.get("FORECAST_SCHEDULE_ORDER", "aic")
+ENGINE_MODE = os.environ.get("FORECAST_SCHEDULE_ENGINE", "fastest")
+
+log = logging.getLogger(__name__)
+_started = threading.Event()
+
+
+def next_run(now=None):
+    # Next weekday at RUN_AT in the market's time zone (holidays just produce an unchanged run).
+    now = now or datetime.now(MARKET_TZ)
+    hour, minute = map(int, RUN_AT.split(":"))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run <= now:
+        run += timedelta(days=1)
+    while run.weekday() >= 5:
+        run += timedelta(days=1)
+    return run
+
+
+def _claim_run(run_key):
+    # Open handle holding the run lock, or None if another process has it or already did this run.
+    os.makedirs(forecast_store.STORE_DIR, exist_ok=True)
+    fd = os.open(os.path.join(forecast_store.STORE_DIR, ".scheduler.lock"), os.O_RDWR | os.O_CREAT)
+    handle = os.fdopen(fd, "r+")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    if handle.read().strip() == run_key:
+        handle.close()
+        return None
+    return handle
+
+
+def _finish_run(handle, run_key):
+    handle.seek(0)
+    handle.truncate()
+    handle.write(run_key)
+    handle.close()
+
+
+def materialize(tickers=None, workers=None, timeout=300.0, order_mode=ORDER_MODE, engine=ENGINE_MODE):
+    tickers = load_watchlist() if tickers is None else tickers
+    if not tickers:
+        return None
+    # Today's bars for the whole list in a few batched requests, before the per-ticker fits.
+    refresh_many(tickers, force=True)
+
+    def store(result):
+        if result["status"] == "ok":
+            save_forecast(result)
+        else:
+            log.warning("forecast for %s failed: %s", result["ticker"], result.get("error"))
+
+    _, summary = run_batch(tickers, workers=workers, timeout=timeout, order_mode=order_mode, engine=engine,
+                           on_result=store)
+    log.info("materialized forecasts: %s", summary)
+    return summary
+
+
+def run_forever(**kwargs):
+    while True:
+        run = next_run()
+        time.sleep(max((run - datetime.now(MARKET_TZ)).total_seconds(), 0))
+        run_key = run.isoformat()
+        handle = _claim_run(run_key)
+        if handle is None:
+            log.info("forecast run for %s is handled by another process", run_key)
+            continue
+        try:
+            materialize(**kwargs)
+        except Exception:
+            log.exception("scheduled forecast run failed")
+            handle.close()
+        else:
+            _finish_run(handle, run_key)
+
+
+def start_in_process():
+    # Idempotent: one scheduler thread per server process, whatever calls it. Every server
+    # process runs one; _claim_run lets only the first of them materialize a given close.
+    if os.environ.get("FORECAST_SCHEDULER", "inprocess") == "off" or _started.is_set():
+        return
+    _started.set()
+    threading.Thread(target=run_forever, name="forecast-scheduler", daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materialize watchlist forecasts after the market close.")
+    parser.add_argument("tickers", nargs="*", help="ticker symbols (default: the watchlist)")
+    parser.add_argument("--once", action="store_true", help="run immediately and exit")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-ticker timeout in seconds")
+    parser.add_argument("--order", choices=ORDER_MODES, default=ORDER_MODE, help="ARIMA order selection")
+    parser.add_argument("--engine", choices=ENGINE_MODES, default=ENGINE_MODE, help="forecasting engine")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    kwargs = dict(tickers=args.tickers or None, workers=args.workers, timeout=args.timeout,
+                  order_mode=args.order, engine=args.engine)
+    if args.once:
+        summary = materialize(**kwargs)
+        print(json.dumps(summary, indent=2))
+        return 0 if summary and summary["ok"] else 1
+    log.info("next run at %s", next_run())
+    run_forever(**kwargs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+# Materialized forecasts: one JSON file per (ticker, order mode, engine mode), written by the
+# forecast scheduler and read by the Prediction page. Each file is a batch_forecast.run_pipeline
+# result plus the time it was computed.
+STORE_DIR = os.environ.get(
+    "FORECAST_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".forecast_store"),
+)
+# Results older than this are ignored (the scheduler has stopped running): long enough to cover a weekend.
+MAX_AGE = timedelta(hours=int(os.environ.get("FORECAST_MAX_AGE_HOURS", 96)))
+
+
+def _result_path(ticker: str, order_mode: str, engine_mode: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", str(ticker).upper())
+    return os.path.join(STORE_DIR, f"{safe}.{order_mode}.{engine_mode}.json")
+
+
+def save_forecast(result: dict) -> str:
+    result = dict(result, computed_at=result.get("computed_at") or datetime.now(timezone.utc).isoformat())
+    path = _result_path(result["ticker"], result["order_mode"], result["engine_mode"])
+    os.makedirs(STORE_DIR, exist_ok=True)
+    # Write to a temp file and rename so readers never see a partial file.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(result, fh)
+    os.replace(tmp, path)
+    return path
+
+
+def load_forecast(ticker: str, order_mode: str = "aic", engine_mode: str = "fastest", max_age=MAX_AGE):
+    # Returns the stored result, or None if this ticker/configuration isn't (recently) materialized.
+    path = _result_path(ticker, order_mode, engine_mode)
+    try:
+        with open(path) as fh:
+            result = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    result["computed_at"] = datetime.fromisoformat(result["computed_at"])
+    if max_age is not None and forecast_age(result) > max_age:
+        return None
+    return result
+
+
+def forecast_to_frame(result: dict) -> pd.DataFrame:
+    forecast = pd.Series(result["forecast"], dtype="float64")
+    forecast.index = pd.to_datetime(forecast.index)
+    frame = forecast.to_frame(name="Close")
+    for column, values in result.get("intervals", {}).items():
+        frame[column] = values
+    return frame
+
+
+def forecast_age(result: dict, now=None):
+    now = now or datetime.now(timezone.utc)
+    return now - result["computed_at"]
@@ -0,0 +1,128 @@
+import copy
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from pages.utils.model_train import get_rolling_mean, scaling, _fit_arima, forecast_frame, forecast_std, add_intervals
+from pages.utils.tracing import traced, count
+
+# Incremental forecast updates. When new daily bars arrive, the cached fitted model is extended
+# with them (ARIMAResults.append(..., refit=False): a Kalman-filter pass, no re-estimation) and the
+# 7-day rolling mean and scaler statistics are updated from the new bars only. A full refit only
+# happens when the fit is older than REFIT_EVERY, when the new one-step-ahead errors are far
+# outside what the model saw in-sample, or when the level of the series has drifted away from the
+# scaler the model was fitted under.
+REFIT_EVERY = timedelta(days=int(os.environ.get("FORECAST_REFIT_DAYS", 7)))
+RESIDUAL_THRESHOLD = 4.0      # new one-step errors, in in-sample residual standard deviations
+SCALE_DRIFT_THRESHOLD = 1.0   # shift of the running mean, in the fitted scaler's standard deviations
+ROLLING_WINDOW = 7
+FORECAST_STEPS = 30
+
+_states = OrderedDict()
+_states_lock = threading.Lock()
+_MAX_STATES = 256
+
+
+class ForecastState:
+    def __init__(self, ticker, order, results, scaler, close_price):
+        self.ticker = ticker
+        self.order = order
+        self.results = results
+        # The model's scaler stays frozen until the next refit; `live_scaler` tracks the
+        # statistics of everything seen since, via partial_fit on each batch of new bars.
+        self.scaler = scaler
+        self.live_scaler = copy.deepcopy(scaler)
+        self.last_date = close_price.index[-1]
+        self.raw_tail = close_price["Close"].iloc[-(ROLLING_WINDOW - 1):].to_numpy(dtype=np.float64)
+        self.fitted_at = datetime.now()
+        burn_in = order[1] + max(order[0], order[2]) + 1
+        resid = np.asarray(results.resid)[burn_in:]
+        self.resid_std = float(np.std(resid)) if len(resid) > 1 else float("inf")
+        self.observations = int(results.nobs)
+
+
+def _full_fit(ticker, close_price, order):
+    rolling_price = get_rolling_mean(close_price)
+    scaled_data, scaler = scaling(rolling_price)
+    results = _fit_arima(scaled_data, order, ticker)
+    return ForecastState(ticker, order, results, scaler, close_price)
+
+
+def _refit_reason(state, results, new_scaled):
+    if datetime.now() - state.fitted_at > REFIT_EVERY:
+        return "scheduled"
+    errors = np.abs(np.asarray(results.resid)[-len(new_scaled):])
+    if np.any(errors > RESIDUAL_THRESHOLD * state.resid_std):
+        return "residual"
+    drift = abs(state.live_scaler.mean_[0] - state.scaler.mean_[0]) / state.scaler.scale_[0]
+    if drift > SCALE_DRIFT_THRESHOLD:
+        return "drift"
+    return None
+
+
+@traced()
+def update_forecast(ticker, close_price, order, steps=FORECAST_STEPS, levels=None):
+    # `close_price` is the full daily Close frame (as from get_data). Returns the forecast in price
+    # units plus how it was produced: "full" (fitted), "append" (extended) or "cached" (no new bars).
+    started = time.perf_counter()
+    key = (str(ticker).upper(), tuple(order))
+    with _states_lock:
+        state = _states.get(key)
+        if state is not None:
+            _states.move_to_end(key)
+
+    mode, reason = "cached", None
+    if state is None:
+        mode, reason = "full", "cold"
+        state = _full_fit(ticker, close_price, tuple(order))
+    else:
+        new_bars = close_price["Close"][close_price.index > state.last_date].to_numpy(dtype=np.float64)
+        if len(new_bars):
+            # Rolling mean of the new bars only needs the previous window - 1 raw closes.
+            window = np.concatenate([state.raw_tail, new_bars])
+            new_rolling = pd.Series(window).rolling(ROLLING_WINDOW).mean().to_numpy()[-len(new_bars):]
+            new_rolling = new_rolling[~np.isnan(new_rolling)].reshape(-1, 1)
+            new_scaled = state.scaler.transform(new_rolling)
+            state.live_scaler.partial_fit(new_rolling)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                results = state.results.append(new_scaled, refit=False)
+            reason = _refit_reason(state, results, new_scaled)
+            if reason is None:
+                mode = "append"
+                state.results = results
+                state.last_date = close_price.index[-1]
+                state.raw_tail = window[-(ROLLING_WINDOW - 1):]
+                state.observations += len(new_scaled)
+            else:
+                mode = "full"
+                state = _full_fit(ticker, close_price, tuple(order))
+
+    count(f"forecast_{mode}")
+    with _states_lock:
+        _states[key] = state
+        while len(_states) > _MAX_STATES:
+            _states.popitem(last=False)
+
+    predictions = np.asarray(state.results.forecast(steps=steps)).reshape(-1, 1)
+    forecast = forecast_frame(state.scaler.inverse_transform(predictions).ravel())
+    if levels:
+        # Bands are linear in the scaled series, so they map back to prices through the scale alone.
+        add_intervals(forecast, forecast_std(state.results, steps) * state.scaler.scale_[0], levels)
+    return {
+        "forecast": forecast,
+        "mode": mode,
+        "refit_reason": reason,
+        "fitted_at": state.fitted_at,
+        "observations": state.observations,
+        # What the forecast came from, for anything that must agree with it (e.g. simulated paths).
+        "results": state.results,
+        "scaler": state.scaler,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from pages.utils.model_cache import data_hash
+
+# Technical indicators computed in one NumPy pass per close series and cached by data version,
+# so switching chart/indicator dropdowns never recomputes them. Definitions follow pandas_ta's
+# defaults (Wilder RSI 14, SMA 50, MACD 12/26/9 with SMA-seeded EMAs).
+RSI_LENGTH = 14
+SMA_LENGTH = 50
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+INDICATOR_COLUMNS = ("RSI", "SMA_50", "MACD", "MACD_Signal", "MACD_Histogram")
+
+_indicator_cache = OrderedDict()
+_indicator_lock = threading.Lock()
+_MAX_CACHED_SERIES = 64
+
+
+def _recursive_mean(values, alpha, initial=None):
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t-1] as a single IIR filter pass.
+    if initial is None:
+        return lfilter([alpha], [1.0, alpha - 1.0], values)
+    return lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * initial])[0]
+
+
+def sma(close, length=SMA_LENGTH):
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if len(close) >= length:
+        csum = np.cumsum(np.insert(close, 0, 0.0))
+        out[length - 1:] = (csum[length:] - csum[:-length]) / length
+    return out
+
+
+def ema(close, length):
+    # Seeded with the SMA of the first `length` values, then the usual adjust=False recursion.
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if len(close) >= length:
+        seed = close[:length].mean()
+        out[length - 1] = seed
+        out[length:] = _recursive_mean(close[length:], 2.0 / (length + 1), initial=seed)
+    return out
+
+
+def _wilder_mean(values, length):
+    # Bias-corrected (adjust=True) exponential mean with alpha = 1/length: ratio of two IIR passes.
+    alpha = 1.0 / length
+    decay = [1.0, alpha - 1.0]
+    num = lfilter([1.0], decay, values)
+    den = lfilter([1.0], decay, np.ones_like(values))
+    out = num / den
+    out[:length - 1] = np.nan
+    return out
+
+
+def rsi(close, length=RSI_LENGTH):
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if len(close) > length:
+        change = np.diff(close)
+        gain = _wilder_mean(np.clip(change, 0.0, None), length)
+        loss = _wilder_mean(np.clip(-change, 0.0, None), length)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[1:] = 100.0 * gain / (gain + loss)
+    return out
+
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = np.full(line.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(line))
+    if len(valid):
+        signal_line[valid[0]:] = ema(line[valid[0]:], signal)
+    return line, signal_line, line - signal_line
+
+
+def compute_indicators(close):
+    close = np.asarray(close, dtype=np.float64).ravel()
+    line, signal_line, histogram = macd(close)
+    return {
+        "RSI": rsi(close),
+        "SMA_50": sma(close, SMA_LENGTH),
+        "MACD": line,
+        "MACD_Signal": signal_line,
+        "MACD_Histogram": histogram,
+    }
+
+
+# Same indicators for a tickers x dates matrix, one filter pass over all rows at once. A row may
+# start later than others (NaN prefix); its values then match compute_indicators on that row's
+# own series. Gaps after a row's first value must already be filled.
+def _sma_2d(values, valid, length):
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] >= length:
+        csum = np.cumsum(np.pad(np.where(valid, values, 0.0), ((0, 0), (1, 0))), axis=1)
+        ccount = np.cumsum(np.pad(valid, ((0, 0), (1, 0))), axis=1)
+        window = (csum[:, length:] - csum[:, :-length]) / length
+        out[:, length - 1:] = np.where(ccount[:, length:] - ccount[:, :-length] == length, window, np.nan)
+    return out
+
+
+def _ema_2d(values, length):
+    # Each row's recursion starts at its own seed: the input is zero before the seed position and
+    # seed / alpha at it, so one lfilter pass over the matrix reproduces every row's ema().
+    valid = ~np.isnan(values)
+    rows, n = values.shape
+    out = np.full(values.shape, np.nan)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), n)
+    seed_at = first + length - 1
+    seeded = np.flatnonzero(seed_at < n)
+    if not len(seeded):
+        return out
+    alpha = 2.0 / (length + 1)
+    csum = np.cumsum(np.pad(np.where(valid, values, 0.0), ((0, 0), (1, 0))), axis=1)
+    seed = (csum[seeded, seed_at[seeded] + 1] - csum[seeded, first[seeded]]) / length
+
+    positions = np.arange(n)
+    inputs = np.where(positions > seed_at[seeded, None], values[seeded], 0.0)
+    inputs[np.arange(len(seeded)), seed_at[seeded]] = seed / alpha
+    filtered = lfilter([alpha], [1.0, alpha - 1.0], inputs, axis=1)
+    out[seeded] = np.where(positions >= seed_at[seeded, None], filtered, np.nan)
+    return out
+
+
+def _wilder_mean_2d(values, valid, length):
+    alpha = 1.0 / length
+    decay = [1.0, alpha - 1.0]
+    num = lfilter([1.0], decay, np.where(valid, values, 0.0), axis=1)
+    den = lfilter([1.0], decay, valid.astype(np.float64), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = num / den
+    out[np.cumsum(valid, axis=1) < length] = np.nan
+    return out
+
+
+def compute_indicator_matrix(close):
+    close = np.asarray(close, dtype=np.float64)
+    valid = ~np.isnan(close)
+
+    rsi_out = np.full(close.shape, np.nan)
+    if close.shape[1] > 1:
+        change = np.diff(close, axis=1)
+        change_valid = valid[:, 1:] & valid[:, :-1]
+        gain = _wilder_mean_2d(np.clip(change, 0.0, None), change_valid, RSI_LENGTH)
+        loss = _wilder_mean_2d(np.clip(-change, 0.0, None), change_valid, RSI_LENGTH)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi_out[:, 1:] = 100.0 * gain / (gain + loss)
+
+    line = _ema_2d(close, MACD_FAST) - _ema_2d(close, MACD_SLOW)
+    signal_line = _ema_2d(line, MACD_SIGNAL)
+    return {
+        "RSI": rsi_out,
+        "SMA_50": _sma_2d(close, valid, SMA_LENGTH),
+        "MACD": line,
+        "MACD_Signal": signal_line,
+        "MACD_Histogram": line - signal_line,
+    }
+
+
+def get_indicators(dataframe: pd.DataFrame, ticker: str = "") -> pd.DataFrame:
+    # Read-only frame of indicator columns aligned to `dataframe.index`; the caller's frame is untouched.
+    close = np.asarray(dataframe["Close"], dtype=np.float64).ravel()
+    key = (str(ticker).upper(), len(close), data_hash(close))
+    with _indicator_lock:
+        frame = _indicator_cache.get(key)
+        if frame is not None:
+            _indicator_cache.move_to_end(key)
+    if frame is not None and frame.index.equals(dataframe.index):
+        return frame
+
+    columns = compute_indicators(close)
+    block = np.column_stack([columns[name] for name in INDICATOR_COLUMNS])
+    block.flags.writeable = False
+    frame = pd.DataFrame(block, index=dataframe.index, columns=list(INDICATOR_COLUMNS), copy=False)
+    with _indicator_lock:
+        _indicator_cache[key] = frame
+        while len(_indicator_cache) > _MAX_CACHED_SERIES:
+            _indicator_cache.popitem(last=False)
+    return frame
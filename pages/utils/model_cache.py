@@ -0,0 +1,137 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+# Fitted models shared by every Streamlit session in this process.
+# Entries are pickled ARIMAResults keyed on (ticker, data hash, order), evicted by LRU and TTL.
+# Each entry also remembers how long its fit took, so callers comparing fit times never time a hit.
+# Set MODEL_CACHE_DIR to also persist them on disk so other processes / restarts can reuse fits.
+MAX_ENTRIES = int(os.environ.get("MODEL_CACHE_MAX_ENTRIES", 64))
+TTL_SECONDS = int(os.environ.get("MODEL_CACHE_TTL_SECONDS", 24 * 60 * 60))
+
+
+def data_hash(data) -> str:
+    values = np.ascontiguousarray(np.asarray(data, dtype=np.float64).ravel())
+    return hashlib.sha1(values.tobytes()).hexdigest()
+
+
+def model_key(ticker, data, order) -> tuple:
+    return (str(ticker or "").upper(), data_hash(data), tuple(order))
+
+
+class ModelCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, cache_dir=None, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key) -> str:
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, name + ".pkl")
+
+    def _load_from_disk(self, key):
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        expires = os.path.getmtime(path) + self.ttl
+        if expires <= self._clock():
+            return None
+        with open(path, "rb") as fh:
+            return expires, fh.read()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None and self.cache_dir:
+                try:
+                    entry = self._load_from_disk(key)
+                except OSError:
+                    entry = None
+                if entry is not None:
+                    # Fitted by another process: its fit time isn't known here.
+                    entry = (*entry, None)
+                    self._insert(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            payload = entry[1]
+        return pickle.loads(payload)
+
+    def _insert(self, key, entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def fit_seconds(self, key):
+        # How long the cached fit for `key` took, or None if it isn't cached or was loaded from disk.
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[2] if entry is not None else None
+
+    def put(self, key, results, fit_seconds=None) -> None:
+        payload = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._insert(key, (self._clock() + self.ttl, payload, fit_seconds))
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(payload)
+            os.replace(tmp, path)
+
+    def get_or_fit(self, key, fit):
+        # Sessions that miss on the same key at the same time wait for a single fit.
+        results = self.get(key)
+        if results is not None:
+            return results
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            return future.result()
+        try:
+            started = time.perf_counter()
+            results = fit()
+            self.put(key, results, time.perf_counter() - started)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(results)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_model_cache = ModelCache(cache_dir=os.environ.get("MODEL_CACHE_DIR") or None)
+
+
+def get_model_cache() -> ModelCache:
+    return _model_cache
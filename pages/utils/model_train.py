@@ -1,11 +1,22 @@
-import yfinance as yf
-from statsmodels.tsa.stattools import adfuller
-from sklearn.metrics import mean_squared_error, r2_score
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from statsmodels.tsa.stattools import adfuller, kpss
+from statsmodels.tools.sm_exceptions import InterpolationWarning
+from sklearn.metrics import mean_squared_error
 from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from statsmodels.tsa.arima_process import arma2ma
+from scipy.linalg import toeplitz
+from scipy.stats import norm
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
+from pages.utils.price_store import get_prices
+from pages.utils.model_cache import get_model_cache, model_key, data_hash
+from pages.utils.tracing import traced, span, count
 
 
 def _close_only(stock_data: pd.DataFrame, symbol: str) -> pd.DataFrame:
@@ -32,22 +43,19 @@ def _close_only(stock_data: pd.DataFrame, symbol: str) -> pd.DataFrame:
         return pd.DataFrame(columns=["Close"])
     return stock_data[["Close"]].copy()
 
+@traced()
 def get_data(ticker):
-    stock_data = yf.download(
-        ticker,
-        start="2025-01-01",
-        auto_adjust=False,
-        actions=False,
-        progress=False,
-        threads=False,
-    )
+    # Served from the local price store; only bars newer than the last stored date hit the network.
+    stock_data = get_prices(str(ticker), start="2025-01-01", precise=True)
     return _close_only(stock_data, str(ticker))
 
+@traced()
 def stationary_check(close_price):
     adf_test = adfuller(close_price)
     p_value = round(adf_test[1], 3)
     return p_value
 
+@traced()
 def get_rolling_mean(close_price):
     # Always return a DataFrame with a single 'Close' column
     if isinstance(close_price, pd.DataFrame) and "Close" in close_price.columns:
@@ -57,45 +65,373 @@ def get_rolling_mean(close_price):
     rolling = pd.Series(close_price).rolling(window=7).mean().dropna()
     return rolling.to_frame(name="Close")
 
-def get_differencing_order(close_price):
-    p_value = stationary_check(close_price)
-    d = 0
-    while True:
-        if p_value > 0.05:
-            d+= 1
-            close_price = close_price.diff().dropna()
-            p_value = stationary_check(close_price)
-        else:
-            break
-    return d
-
-def fit_model(data, difference_order):
-    model = ARIMA(data, order=(30, difference_order, 30))
-    model_fit = model.fit()
-    
-    forecast_steps = 30
-    forecast = model_fit.get_forecast(steps=forecast_steps)
+# Differencing search is bounded: past d=2 a price series is being over-differenced.
+MAX_DIFFERENCING_ORDER = 2
+# Above this many points the ADF lag is fixed by Schwert's rule instead of searched by AIC,
+# which turns each test into a single regression.
+FAST_PATH_MIN_LENGTH = 2000
+DIFFERENCING_METHODS = ("auto", "adf", "adf_fixed_lag", "kpss")
+
+_differencing_cache = OrderedDict()
+_differencing_lock = threading.Lock()
+_MAX_DIFFERENCING_ENTRIES = 256
+
+
+@traced("stationary_check")
+def _stationarity_test(values, method):
+    # Returns (is_stationary, p_value). KPSS has stationarity as its null, ADF has a unit root.
+    if method == "kpss":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", InterpolationWarning)
+            p_value = round(float(kpss(values, regression="c", nlags="auto")[1]), 3)
+        return p_value >= 0.05, p_value
+    if method == "adf_fixed_lag":
+        lag = int(12 * (len(values) / 100.0) ** 0.25)
+        p_value = round(float(adfuller(values, maxlag=lag, autolag=None)[1]), 3)
+    else:
+        p_value = round(float(adfuller(values)[1]), 3)
+    return p_value <= 0.05, p_value
+
+
+def differencing_analysis(close_price, max_order=MAX_DIFFERENCING_ORDER, method="auto"):
+    if method not in DIFFERENCING_METHODS:
+        raise ValueError(f"method must be one of {DIFFERENCING_METHODS}, got {method!r}")
+    values = np.asarray(close_price, dtype=np.float64).ravel()
+    values = values[~np.isnan(values)]
+    if method == "auto":
+        method = "adf_fixed_lag" if len(values) > FAST_PATH_MIN_LENGTH else "adf"
+
+    key = (data_hash(values), max_order, method)
+    with _differencing_lock:
+        if key in _differencing_cache:
+            _differencing_cache.move_to_end(key)
+            return _differencing_cache[key]
+
+    # Each order differences the previous one once instead of starting again from the levels.
+    stationary, p_value = _stationarity_test(values, method)
+    p_values = [p_value]
+    series = values
+    while not stationary and len(p_values) <= max_order:
+        series = np.diff(series)
+        stationary, p_value = _stationarity_test(series, method)
+        p_values.append(p_value)
+
+    analysis = {"d": len(p_values) - 1, "p_values": p_values, "method": method}
+    with _differencing_lock:
+        _differencing_cache[key] = analysis
+        while len(_differencing_cache) > _MAX_DIFFERENCING_ENTRIES:
+            _differencing_cache.popitem(last=False)
+    return analysis
+
+@traced()
+def get_differencing_order(close_price, max_order=MAX_DIFFERENCING_ORDER, method="auto"):
+    return differencing_analysis(close_price, max_order, method)["d"]
+
+def _arima_fit(data, order, ticker=""):
+    # (cache key, fit function) of an ARIMA on `data`.
+    key = model_key(ticker, data, order)
+
+    def fit():
+        count("arima_fits")
+        with span("ARIMA.fit", order=str(order), n=len(data)):
+            return ARIMA(data, order=order).fit()
+    return key, fit
+
+def _fit_arima(data, order, ticker=""):
+    # Fits are shared across sessions: same ticker + same data + same order -> no refit.
+    return get_model_cache().get_or_fit(*_arima_fit(data, order, ticker))
+
+# Forecasting engines. Each one fits on the scaled series and returns an object with
+# .forecast(steps), so fit_model/evaluate_model/get_forecast work the same for all of them:
+#   "arima"       - the original ARIMA, (30, d, 30) unless an order is selected
+#   "state_space" - the same state-space ARIMA with a small fixed order
+#   "ets"         - exponential smoothing, with a damped additive trend when the series needs differencing
+#   "linear_ar"   - least-squares autoregression on the differenced series, in plain NumPy
+FORECAST_ENGINES = ("arima", "state_space", "ets", "linear_ar")
+STATE_SPACE_ORDER = (2, 2)
+AR_LAGS = 10
+# The page picks the fastest engine whose holdout RMSE is within this fraction of the best one.
+ENGINE_RMSE_TOLERANCE = 0.10
+
+
+class LinearAR:
+    # AR(p) with intercept on the d-times differenced series; forecasts are integrated back up.
+    def __init__(self, lags=AR_LAGS, differencing_order=0):
+        self.lags = lags
+        self.differencing_order = differencing_order
+
+    def fit(self, data):
+        series = np.asarray(data, dtype=np.float64).ravel()
+        self.levels = []
+        for _ in range(self.differencing_order):
+            self.levels.append(series[-1])
+            series = np.diff(series)
+        self.lags = max(1, min(self.lags, len(series) // 4))
+        # Row i holds series[i:i + lags] and predicts series[i + lags].
+        lagged = np.lib.stride_tricks.sliding_window_view(series[:-1], self.lags)
+        design = np.column_stack([np.ones(len(lagged)), lagged])
+        self.coef = np.linalg.lstsq(design, series[self.lags:], rcond=None)[0]
+        self.sigma = float(np.sqrt(np.mean((series[self.lags:] - design @ self.coef) ** 2)))
+        self.history = series[-self.lags:].copy()
+        return self
+
+    def extend(self, data):
+        # Same coefficients, conditioned on the end of `data` instead of the fitted series.
+        extended = LinearAR(self.lags, self.differencing_order)
+        extended.coef, extended.sigma, extended.levels = self.coef, self.sigma, []
+        series = np.asarray(data, dtype=np.float64).ravel()
+        for _ in range(self.differencing_order):
+            extended.levels.append(series[-1])
+            series = np.diff(series)
+        extended.history = series[-self.lags:].copy()
+        return extended
+
+    def forecast(self, steps):
+        window = np.concatenate([self.history, np.empty(steps)])
+        for i in range(steps):
+            window[self.lags + i] = self.coef[0] + self.coef[1:] @ window[i:self.lags + i]
+        predictions = window[self.lags:]
+        for level in reversed(self.levels):
+            predictions = level + np.cumsum(predictions)
+        return predictions
+
+
+def engine_order(engine, difference_order, order=None):
+    # ARIMA order used by the ARIMA-based engines (None for the others).
+    if engine == "arima":
+        return tuple(order) if order is not None else (30, difference_order, 30)
+    if engine == "state_space":
+        return (STATE_SPACE_ORDER[0], difference_order, STATE_SPACE_ORDER[1])
+    return None
+
+
+def _engine_fit(data, difference_order, ticker="", order=None, engine="arima"):
+    # (cache key, fit function) of any engine on `data`.
+    if engine not in FORECAST_ENGINES:
+        raise ValueError(f"engine must be one of {FORECAST_ENGINES}, got {engine!r}")
+    arima_order = engine_order(engine, difference_order, order)
+    if arima_order is not None:
+        return _arima_fit(data, arima_order, ticker)
+
+    # The other engines share the model cache; their keys can't collide with an ARIMA (p, d, q).
+    key = model_key(ticker, data, (engine, difference_order))
+
+    def fit():
+        count(f"{engine}_fits")
+        with span(f"{engine}.fit", n=len(data)):
+            values = np.asarray(data, dtype=np.float64).ravel()
+            if engine == "ets":
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    trend = "add" if difference_order > 0 else None
+                    return ExponentialSmoothing(values, trend=trend, damped_trend=trend is not None).fit()
+            return LinearAR(AR_LAGS, difference_order).fit(values)
+    return key, fit
 
-    predictions = forecast.predicted_mean
+def _fit_engine(data, difference_order, ticker="", order=None, engine="arima"):
+    return get_model_cache().get_or_fit(*_engine_fit(data, difference_order, ticker, order, engine))
+
+@traced()
+def fit_model(data, difference_order, ticker="", order=None, engine="arima", steps=30):
+    # `order` comes from order_search.select_order; default keeps the original fixed (30, d, 30).
+    model_fit = _fit_engine(data, difference_order, ticker, order, engine)
+    
+    predictions = model_fit.forecast(steps=steps)
     return predictions
 
-def evaluate_model(original_price, differencing_order):
+def _extend_fit(model_fit, data):
+    # The fitted model carried forward to the end of `data` (which continues its training series)
+    # with the parameters it already has: one filter pass, no re-estimation.
+    values = np.asarray(data, dtype=np.float64).ravel()
+    if isinstance(model_fit, LinearAR):
+        return model_fit.extend(values)
+    if hasattr(model_fit, "append"):
+        return model_fit.append(values[len(model_fit.model.endog):])
+    params, model = model_fit.params, model_fit.model
+    trend = "add" if model.has_trend else None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return ExponentialSmoothing(
+            values, trend=trend, damped_trend=model.damped_trend, initialization_method="known",
+            initial_level=params["initial_level"], initial_trend=params["initial_trend"] if trend else None,
+        ).fit(smoothing_level=params["smoothing_level"], smoothing_trend=params["smoothing_trend"] if trend else None,
+              damping_trend=params["damping_trend"] if model.damped_trend else None, optimized=False)
+
+@traced()
+def evaluate_and_forecast(original_price, differencing_order, ticker="", order=None, engine="arima", steps=30,
+                          levels=None):
+    # evaluate_model + get_forecast from a single fit: the holdout model is scored, then carried
+    # over the last 30 observations (_extend_fit) to forecast. Returns (rmse, forecast frame).
     train_data, test_data = original_price[:-30], original_price[-30:]
-    predictions = fit_model(train_data, differencing_order)
+    model_fit = _fit_engine(train_data, differencing_order, ticker, order, engine)
+    rmse = round(np.sqrt(mean_squared_error(test_data, model_fit.forecast(steps=30))), 2)
+    model_fit = _extend_fit(model_fit, original_price)
+    forecast = forecast_frame(model_fit.forecast(steps=steps))
+    if levels:
+        add_intervals(forecast, forecast_std(model_fit, steps), levels)
+    return rmse, forecast
+
+@traced()
+def evaluate_model(original_price, differencing_order, ticker="", order=None, engine="arima"):
+    train_data, test_data = original_price[:-30], original_price[-30:]
+    predictions = fit_model(train_data, differencing_order, ticker, order, engine)
     rmse = np.sqrt(mean_squared_error(test_data, predictions))
     return round(rmse, 2)
 
+_engine_comparisons = OrderedDict()
+_engine_lock = threading.Lock()
+_MAX_ENGINE_COMPARISONS = 64
+
+
+@traced()
+def compare_engines(original_price, differencing_order, ticker="", order=None, engines=FORECAST_ENGINES,
+                    tolerance=ENGINE_RMSE_TOLERANCE):
+    # Holdout RMSE and fit time per engine, plus the fastest engine within `tolerance` of the best
+    # RMSE. Fit times are those of the actual fits, recorded when the model cache stored them, so a
+    # cached engine doesn't look free. Memoized per ticker, data and settings.
+    key = (str(ticker).upper(), data_hash(original_price), differencing_order,
+           tuple(order) if order is not None else None, tuple(engines), tolerance)
+    with _engine_lock:
+        if key in _engine_comparisons:
+            _engine_comparisons.move_to_end(key)
+            return _engine_comparisons[key]
+
+    rows = []
+    cache = get_model_cache()
+    for engine in engines:
+        rmse = evaluate_model(original_price, differencing_order, ticker, order, engine)
+        fit_key, fit = _engine_fit(original_price[:-30], differencing_order, ticker, order, engine)
+        seconds = cache.fit_seconds(fit_key)
+        if seconds is None:
+            # Loaded from MODEL_CACHE_DIR (or already evicted): time a fit of our own.
+            started = time.perf_counter()
+            fit()
+            seconds = time.perf_counter() - started
+        rows.append({"engine": engine, "rmse": rmse, "seconds": round(seconds, 3)})
+    table = pd.DataFrame(rows).set_index("engine")
+    best_rmse = float(table["rmse"].min())
+    table["within_tolerance"] = table["rmse"] <= best_rmse * (1 + tolerance)
+    comparison = {
+        "engine": table[table["within_tolerance"]]["seconds"].idxmin(),
+        "table": table,
+        "best_rmse": best_rmse,
+        "tolerance": tolerance,
+    }
+    with _engine_lock:
+        _engine_comparisons[key] = comparison
+        while len(_engine_comparisons) > _MAX_ENGINE_COMPARISONS:
+            _engine_comparisons.popitem(last=False)
+    return comparison
+
 def scaling(close_price):
     scaler = StandardScaler()
     scaled_data = scaler.fit_transform(np.array(close_price).reshape(-1, 1))
     return scaled_data, scaler
 
-def get_forecast(original_price, differencing_order):
-    predictions = fit_model(original_price, differencing_order)
+@traced()
+def get_forecast(original_price, differencing_order, ticker="", order=None, engine="arima", steps=30, levels=None):
+    # One call with steps=max(horizons) covers every shorter horizon too: slice, don't refit.
+    # `levels` (e.g. INTERVAL_LEVELS) adds Lower/Upper columns from the same fitted model.
+    model_fit = _fit_engine(original_price, differencing_order, ticker, order, engine)
+    forecast = forecast_frame(model_fit.forecast(steps=steps))
+    if levels:
+        add_intervals(forecast, forecast_std(model_fit, steps), levels)
+    return forecast
+
+# Prediction intervals come from the fitted model's MA(infinity) weights: the h-step forecast error
+# is sum(psi_j * e_{t+h-j}), so its standard deviation is sigma * sqrt(cumsum(psi ** 2)) with no
+# refitting or bootstrapping. The same weights drive the Monte-Carlo paths below. For the statsmodels
+# ARIMA engines the bands use the model's own forecast standard errors instead, which also carry
+# the uncertainty of the filtered state the weights leave out.
+INTERVAL_LEVELS = (0.80, 0.95)
+SIMULATION_PATHS = 1000
+
+
+def _psi_weights(model_fit, steps):
+    # Returns (psi, sigma) for the first `steps` forecast errors of any engine's fitted model.
+    if isinstance(model_fit, LinearAR):
+        # coef[1:] runs from the oldest lag to lag 1.
+        ar = np.r_[1.0, -model_fit.coef[1:][::-1]]
+        ma, sigma, d = np.array([1.0]), model_fit.sigma, model_fit.differencing_order
+    elif hasattr(model_fit, "polynomial_ar"):
+        ar, ma = model_fit.polynomial_ar, model_fit.polynomial_ma
+        sigma = float(np.sqrt(model_fit.params[model_fit.model.param_names.index("sigma2")]))
+        d = model_fit.model.k_diff
+    else:
+        # Holt / damped Holt in error-correction form: psi_j = alpha * (1 + beta * (phi + ... + phi^j)).
+        params = model_fit.params
+        alpha = params["smoothing_level"]
+        beta = params["smoothing_trend"] if np.isfinite(params["smoothing_trend"]) else 0.0
+        phi = params["damping_trend"] if np.isfinite(params["damping_trend"]) else 1.0
+        damped = np.cumsum(phi ** np.arange(1, steps))
+        psi = np.r_[1.0, alpha * (1 + beta * damped)]
+        return psi, float(np.sqrt(model_fit.sse / len(model_fit.fittedvalues)))
+    for _ in range(d):
+        ar = np.convolve(ar, [1.0, -1.0])
+    return arma2ma(ar, ma, lags=steps), sigma
+
+
+def forecast_std(model_fit, steps):
+    if hasattr(model_fit, "get_forecast"):
+        return np.asarray(model_fit.get_forecast(steps=steps).se_mean, dtype=np.float64).ravel()
+    psi, sigma = _psi_weights(model_fit, steps)
+    return sigma * np.sqrt(np.cumsum(psi ** 2))
+
+
+def interval_columns(level):
+    return f"Lower {level:.0%}", f"Upper {level:.0%}"
+
+
+def add_intervals(forecast, std, levels=INTERVAL_LEVELS):
+    # Adds symmetric normal bands around forecast['Close'] in place; `std` is in the same units.
+    for level in levels:
+        lower, upper = interval_columns(level)
+        z = norm.ppf(0.5 + level / 2)
+        forecast[lower] = forecast['Close'].to_numpy() - z * std
+        forecast[upper] = forecast['Close'].to_numpy() + z * std
+    return forecast
+
+
+def simulate_paths(model_fit, steps=30, n_paths=SIMULATION_PATHS, seed=0):
+    # (n_paths, steps) simulated futures of a fitted model. The statsmodels ARIMA engines simulate
+    # themselves from the end of the sample, filtered-state uncertainty included, so the paths agree
+    # with forecast_std's se_mean bands; the other engines draw through their MA(infinity) weights.
+    count("forecast_simulations")
+    rng = np.random.default_rng(seed)
+    if hasattr(model_fit, "get_forecast"):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            paths = model_fit.simulate(steps, repetitions=n_paths, anchor="end", rng=rng)
+        return np.asarray(paths, dtype=np.float64).reshape(steps, n_paths).T
+    mean = np.asarray(model_fit.forecast(steps=steps), dtype=np.float64).ravel()
+    psi, sigma = _psi_weights(model_fit, steps)
+    shocks = rng.standard_normal((n_paths, steps)) * sigma
+    # Path value at step t is mean[t] + sum_j shocks[j] * psi[t - j]: one matmul for every path.
+    return mean + shocks @ toeplitz(np.r_[psi[0], np.zeros(steps - 1)], psi)
+
+
+@traced()
+def simulate_forecast(original_price, differencing_order, ticker="", order=None, engine="arima", steps=30,
+                      n_paths=SIMULATION_PATHS, seed=0):
+    # Paths of the model get_forecast uses, cached next to it.
+    model_fit = _fit_engine(original_price, differencing_order, ticker, order, engine)
+    key = model_key(ticker, original_price, ("simulate", engine, differencing_order,
+                                             tuple(order) if order is not None else None, steps, n_paths, seed))
+    return get_model_cache().get_or_fit(key, lambda: simulate_paths(model_fit, steps, n_paths, seed))
+
+
+@traced()
+def simulate_results(results, ticker="", steps=30, n_paths=SIMULATION_PATHS, seed=0):
+    # Paths of an already fitted statsmodels results object (e.g. update_forecast's appended one),
+    # cached on its data and parameters.
+    key = model_key(ticker, results.model.endog, ("simulate", data_hash(np.asarray(results.params)), steps, n_paths, seed))
+    return get_model_cache().get_or_fit(key, lambda: simulate_paths(results, steps, n_paths, seed))
+
+def forecast_frame(predictions):
+    # One row per trading (business) day, starting today, so forecasts line up with real sessions.
     start_date = datetime.now().strftime('%Y-%m-%d')
-    end_date = (datetime.now() + timedelta(days=29)).strftime('%Y-%m-%d')
-    forecast_index = pd.date_range(start=start_date, end=end_date, freq='D')
-    forecast_df = pd.DataFrame(predictions, index=forecast_index, columns=['Close'])
+    forecast_index = pd.bdate_range(start=start_date, periods=len(predictions))
+    forecast_df = pd.DataFrame(np.asarray(predictions).reshape(-1, 1), index=forecast_index, columns=['Close'])
     return forecast_df
 
 def inverse_scaling(scaler, scaled_data):
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+from statsmodels.tsa.arima.model import ARIMA
+
+from pages.utils.model_cache import data_hash
+from pages.utils.tracing import traced
+from pages.utils.workers import WorkerPool
+
+# Bounded (p, d, q) search scored by AIC/BIC, used instead of the fixed (30, d, 30).
+# Candidates are fitted in waves of equal complexity (p + q), each wave in parallel;
+# once `patience` consecutive waves fail to improve on the best score the rest of the
+# grid is skipped, since larger orders almost never win back what they lose in penalty.
+DEFAULT_P_VALUES = tuple(range(0, 6))
+DEFAULT_Q_VALUES = tuple(range(0, 6))
+CRITERIA = ("aic", "bic")
+
+_selection_cache = OrderedDict()
+_selection_lock = threading.Lock()
+_MAX_SELECTIONS = 128
+
+
+def _score_candidate(data, order):
+    start = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            result = ARIMA(data, order=order).fit()
+        aic, bic = float(result.aic), float(result.bic)
+    except Exception:
+        aic = bic = float("inf")
+    return order, aic, bic, time.perf_counter() - start
+
+
+def _waves(p_values, q_values, d):
+    candidates = sorted({(p, d, q) for p in p_values for q in q_values}, key=lambda o: (o[0] + o[2], o))
+    waves = OrderedDict()
+    for order in candidates:
+        waves.setdefault(order[0] + order[2], []).append(order)
+    return list(waves.values())
+
+
+@traced()
+def select_order(data, differencing_order, p_values=DEFAULT_P_VALUES, q_values=DEFAULT_Q_VALUES,
+                 criterion="aic", patience=2, max_workers=None):
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}, got {criterion!r}")
+
+    data = np.asarray(data, dtype=np.float64).ravel()
+    cache_key = (data_hash(data), differencing_order, tuple(p_values), tuple(q_values), criterion, patience)
+    with _selection_lock:
+        if cache_key in _selection_cache:
+            _selection_cache.move_to_end(cache_key)
+            return _selection_cache[cache_key]
+
+    started = time.perf_counter()
+    max_workers = max_workers or os.cpu_count() or 1
+    scores, timings = {}, {}
+    best_order, best_score = None, float("inf")
+    stale_waves = 0
+
+    with WorkerPool(max_workers=max_workers) as pool:
+        for wave in _waves(p_values, q_values, differencing_order):
+            improved = False
+            for order, aic, bic, seconds in pool.map(_score_candidate, [data] * len(wave), wave):
+                score = aic if criterion == "aic" else bic
+                scores[order] = score
+                timings[order] = round(seconds, 4)
+                if score < best_score:
+                    best_order, best_score = order, score
+                    improved = True
+            stale_waves = 0 if improved else stale_waves + 1
+            if stale_waves >= patience:
+                break
+
+    if best_order is None:
+        # Nothing converged; fall back to modelling the differenced series as noise.
+        best_order = (0, differencing_order, 0)
+
+    selection = {
+        "order": best_order,
+        "criterion": criterion,
+        "score": best_score,
+        "scores": scores,
+        "fit_seconds": timings,
+        "candidates_fitted": len(scores),
+        "grid_size": len(p_values) * len(q_values),
+        "total_seconds": round(time.perf_counter() - started, 4),
+    }
+    with _selection_lock:
+        _selection_cache[cache_key] = selection
+        while len(_selection_cache) > _MAX_SELECTIONS:
+            _selection_cache.popitem(last=False)
+    return selection
@@ -1,15 +1,70 @@
 from datetime import datetime
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
-import dateutil
-import pandas_ta as ta
-
+import threading
+from collections import OrderedDict
+from dateutil.relativedelta import relativedelta
+from pages.utils.indicators import get_indicators
+from pages.utils.tracing import traced
+from pages.utils.downsample import DEFAULT_CHART_WIDTH, line_target, candle_target, lttb, ohlc_buckets
+
+# Figure factory: the layouts below are validated once at import and every chart hands its traces
+# straight to go.Figure with one of them, instead of building an empty figure and re-validating the
+# same layout on every call. The lean template keeps plotly's default theme (several KB per figure)
+# out of the spec; Streamlit applies its own theme on top either way.
+# Series go in as NumPy arrays so they serialize as binary typed arrays, dates included: x values
+# are epoch milliseconds on a 'date' axis rather than one ISO string per point.
+_TEMPLATE = go.layout.Template()
+_COLORS = dict(plot_bgcolor = 'white', paper_bgcolor = '#e1efff')
+
+TABLE_LAYOUT = go.Layout(template=_TEMPLATE, height=400, margin=dict(l=0, r=0, b=0, t=0))
+PRICE_LAYOUT = go.Layout(template=_TEMPLATE, height = 500, margin=dict(l=0, r=20, t=20, b=0), legend=dict(yanchor="top", xanchor="right"),
+                         xaxis=dict(type='date', rangeslider_visible=True), **_COLORS)
+CANDLE_LAYOUT = go.Layout(template=_TEMPLATE, showlegend=False, height = 500, margin=dict(l=0, r=20, t=20, b=0), xaxis=dict(type='date'), **_COLORS)
+INDICATOR_LAYOUT = go.Layout(template=_TEMPLATE, height = 200, margin=dict(l=0, r=0, t=0, b=0),
+                             legend=dict(orientation="h", yanchor="top", y=1.02, xanchor="right", x=1), xaxis=dict(type='date'), **_COLORS)
+# RSI bands are three shapes in the layout, not two more full-length traces.
+RSI_LAYOUT = go.Layout(INDICATOR_LAYOUT, yaxis_range=[0, 100], shapes=[
+    dict(type='rect', xref='paper', x0=0, x1=1, y0=30, y1=70, fillcolor='rgba(0, 128, 0, 0.1)', line_width=0, layer='below'),
+    dict(type='line', xref='paper', x0=0, x1=1, y0=70, y1=70, line=dict(color='red', width=1, dash='dash'), name='Overbought', showlegend=True),
+    dict(type='line', xref='paper', x0=0, x1=1, y0=30, y1=30, line=dict(color='green', width=1, dash='dash'), name='Oversold', showlegend=True),
+])
+COMPARISON_LAYOUT = go.Layout(template=_TEMPLATE, height = 500, margin=dict(l=0, r=20, t=20, b=0), legend=dict(yanchor="top", xanchor="right"),
+                              xaxis=dict(type='date'), yaxis_title='% change from 7d mean', **_COLORS)
+_STREAM_LAYOUT = go.Layout(template=_TEMPLATE, margin=dict(l=0, r=0, t=0, b=0), xaxis=dict(type='date'),
+                           legend=dict(orientation="h", yanchor="top", y=1.02, xanchor="right", x=1), **_COLORS)
+STREAM_PRICE_LAYOUT = go.Layout(_STREAM_LAYOUT, height = 400)
+STREAM_MACD_LAYOUT = go.Layout(_STREAM_LAYOUT, height = 200)
+STREAM_RSI_LAYOUT = go.Layout(_STREAM_LAYOUT, height = 200, yaxis_range=[0, 100], shapes=[
+    dict(type='line', xref='paper', x0=0, x1=1, y0=70, y1=70, line=dict(color='red', width=1, dash='dash')),
+    dict(type='line', xref='paper', x0=0, x1=1, y0=30, y1=30, line=dict(color='green', width=1, dash='dash')),
+])
+# MACD histogram colours as 0/1 codes on a two-colour scale: one int8 array instead of a string per bar.
+MACD_COLORSCALE = [[0, 'red'], [1, 'green']]
+OHLC_LINES = (('Open', '#5ab7ff'), ('Close', '#ff7f0e'), ('High', '#2ca02c'), ('Low', '#d62728'))
+
+
+def _figure(layout, traces):
+    return go.Figure(data=traces, layout=layout)
+
+
+def _dates(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        # Wall-clock time of the exchange, as plotly shows a timestamp string with an offset.
+        index = index.tz_localize(None)
+    return index.as_unit('ms').asi8.astype(np.float64)
+
+
+@traced()
 def plotly_table(dataframe):
     header_color = 'grey'
     rowEvenColor = '#f8fafd'
     rowOddColor = '#e1efff'
     fill_colors = [rowOddColor if i % 2 == 0 else rowEvenColor for i in range(len(dataframe.columns) + 1)]
 
-    fig = go.Figure(data=[go.Table(
+    return _figure(TABLE_LAYOUT, [go.Table(
         header=dict(
             values=["<b><b>"] + ["<b>" + str(i)[:10] + "<b>" for i in dataframe.columns],
             line_color='#0078ff', fill_color='#0078ff',
@@ -22,138 +77,187 @@ def plotly_table(dataframe):
         )
     )])
 
-    fig.update_layout(height=400, margin=dict(l=0, r=0, b=0, t=0))
-    return fig 
-
-def filter_date(dataframe, num_period):
-    if num_period == '1mo':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(months=-1)
-    elif num_period == '5d':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(days=-5)
-    elif num_period == '3mo':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(months=-3)
-    elif num_period == '6mo':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(months=-6)
-    elif num_period == '1y':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(years=-1)
-    elif num_period == '5y':
-        date = dataframe.index[-1] + dateutil.relativedelta.relativedelta(years=-5)
-    elif num_period == 'ytd':
-        date = datetime(dataframe.index[-1].year, 1, 1).strftime('%Y-%m-%d')
-    else:
-        date = dataframe.index[0]
-    
-    return dataframe.reset_index()[dataframe.reset_index()['Date']>date]
-
-
-def close_chart(dataframe, num_period = False):
-    if num_period:
-        dataframe = filter_date(dataframe, num_period)
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Open'], mode='lines', name='Open', line=dict(color='#5ab7ff', width=2)))
-
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Close'], mode='lines', name='Close', line=dict(color='#ff7f0e', width=2)))
-
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['High'], mode='lines', name='High', line=dict(color='#2ca02c', width=2)))
+# Start of each selectable period, measured back from the last bar.
+PERIOD_OFFSETS = {
+    '5d': relativedelta(days=-5),
+    '1mo': relativedelta(months=-1),
+    '3mo': relativedelta(months=-3),
+    '6mo': relativedelta(months=-6),
+    '1y': relativedelta(years=-1),
+    '5y': relativedelta(years=-5),
+}
+
+_period_bounds_cache = OrderedDict()
+_period_bounds_lock = threading.Lock()
+_MAX_CACHED_BOUNDS = 128
+
+
+def period_bounds(index):
+    # Row position where each period starts, found by binary search on the sorted index.
+    # Computed once per (length, first, last bar), i.e. once per ticker data version.
+    key = (len(index), index[0], index[-1])
+    with _period_bounds_lock:
+        bounds = _period_bounds_cache.get(key)
+        if bounds is not None:
+            _period_bounds_cache.move_to_end(key)
+            return bounds
+
+    last = index[-1]
+    starts = {period: last + offset for period, offset in PERIOD_OFFSETS.items()}
+    starts['ytd'] = datetime(last.year, 1, 1)
+    positions = index.searchsorted(list(starts.values()), side='right')
+    bounds = dict(zip(starts, (int(p) for p in positions)))
+    bounds['max'] = 0
+
+    with _period_bounds_lock:
+        _period_bounds_cache[key] = bounds
+        while len(_period_bounds_cache) > _MAX_CACHED_BOUNDS:
+            _period_bounds_cache.popitem(last=False)
+    return bounds
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Low'], mode='lines', name='Low', line=dict(color='#d62728', width=2)))
-
-    fig.update_xaxes(rangeslider_visible=True)
-    fig.update_layout(height = 500, margin=dict(l=0, r=20, t=20, b=0), plot_bgcolor = 'white', paper_bgcolor = '#e1efff', legend=dict(
-        yanchor="top",
-
-        xanchor="right"
-    ))
-    return fig
-
-def candlestick(dataframe, num_period):
-    dataframe = filter_date(dataframe, num_period)
-    fig = go.Figure()
-    fig.add_trace(go.Candlestick(x=dataframe['Date'], open=dataframe['Open'], high=dataframe['High'], low=dataframe['Low'], close=dataframe['Close']))
-
-    fig.update_layout(showlegend=False, height = 500, margin=dict(l=0, r=20, t=20, b=0), plot_bgcolor = 'white', paper_bgcolor = '#e1efff')
-    return fig
-
-def RSI(dataframe, num_period):
-    dataframe['RSI'] = ta.rsi(dataframe['Close'])
-    dataframe = filter_date(dataframe, num_period)
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe.RSI, name = 'RSI', marker_color='orange', line=dict(color='orange', width=2)))
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=[70] * len(dataframe), name = 'Overbought', marker_color='red', line=dict(color='red', width=1, dash='dash')))
-
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=[30] * len(dataframe), fill='tonexty', name = 'Oversold', marker_color='green', line=dict(color='green', width=1, dash='dash')))
-
-    fig.update_layout(yaxis_range=[0, 100], height = 200, plot_bgcolor = 'white', paper_bgcolor = '#e1efff', margin=dict(l=0, r=0, t=0, b=0), legend=dict(orientation="h", yanchor="top", y=1.02, xanchor="right", x=1))
-    
-    return fig
-
-def Moving_Average(dataframe, num_period):
-    dataframe['SMA_50'] = ta.sma(dataframe['Close'],50)
-    dataframe = filter_date(dataframe, num_period)
-    fig = go.Figure()
-
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Open'], mode='lines', name='Open', line=dict(color='#5ab7ff', width=2)))
+def filter_date(dataframe, num_period):
+    # Positional slice of the original frame: no reset_index copies, no boolean mask.
+    if dataframe.empty:
+        return dataframe
+    return dataframe.iloc[period_bounds(dataframe.index).get(num_period, 0):]
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Close'], mode='lines', name='Close', line=dict(color='#ff7f0e', width=2)))
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['High'], mode='lines', name='High', line=dict(color='#2ca02c', width=2)))
+def _line(index, values, width, **kwargs):
+    # Long histories are reduced with LTTB to about one point per pixel of chart width;
+    # periods shorter than that (5D..1Y) go out at full resolution.
+    x, y = lttb(index, values, line_target(width))
+    return go.Scatter(x=_dates(x), y=y, **kwargs)
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['Low'], mode='lines', name='Low', line=dict(color='#d62728', width=2)))
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['SMA_50'], mode='lines', name='SMA 50', line=dict(color='purple', width=2, dash='dash')))
+def _ohlc_lines(dataframe, width):
+    return [_line(dataframe.index, dataframe[name], width, mode='lines', name=name, line=dict(color=color, width=2))
+            for name, color in OHLC_LINES]
 
-    fig.update_xaxes(rangeslider_visible=True)
-    fig.update_layout(height = 500, margin=dict(l=0, r=20, t=20, b=0), plot_bgcolor = 'white', paper_bgcolor = '#e1efff', legend=dict(
-        yanchor="top",
 
-        xanchor="right"
-    ))
-    return fig
+@traced()
+def close_chart(dataframe, num_period = False, width=DEFAULT_CHART_WIDTH):
+    if num_period:
+        dataframe = filter_date(dataframe, num_period)
+    return _figure(PRICE_LAYOUT, _ohlc_lines(dataframe, width))
+
+@traced()
+def candlestick(dataframe, num_period, width=DEFAULT_CHART_WIDTH):
+    # Long ranges are aggregated into wider OHLC candles rather than dropping bars.
+    dataframe = ohlc_buckets(filter_date(dataframe, num_period), candle_target(width))
+    return _figure(CANDLE_LAYOUT, [go.Candlestick(
+        x=_dates(dataframe.index),
+        open=dataframe['Open'].to_numpy(dtype=np.float64), high=dataframe['High'].to_numpy(dtype=np.float64),
+        low=dataframe['Low'].to_numpy(dtype=np.float64), close=dataframe['Close'].to_numpy(dtype=np.float64),
+    )])
 
+@traced()
+def RSI(dataframe, num_period, width=DEFAULT_CHART_WIDTH):
+    dataframe = filter_date(get_indicators(dataframe), num_period)
+    return _figure(RSI_LAYOUT, [_line(dataframe.index, dataframe['RSI'], width, name = 'RSI', marker_color='orange', line=dict(color='orange', width=2))])
 
-def MACD(dataframe, num_period):
-    macd = ta.macd(dataframe['Close']).iloc[:,0]
-    macd_signal = ta.macd(dataframe['Close']).iloc[:,1]
-    macd_histogram = ta.macd(dataframe['Close']).iloc[:,2]
-    dataframe['MACD'] = macd
-    dataframe['MACD_Signal'] = macd_signal
-    dataframe['MACD_Histogram'] = macd_histogram
+@traced()
+def Moving_Average(dataframe, num_period, width=DEFAULT_CHART_WIDTH):
+    indicators = filter_date(get_indicators(dataframe), num_period)
     dataframe = filter_date(dataframe, num_period)
-    fig = go.Figure()
+    sma = _line(indicators.index, indicators['SMA_50'], width, mode='lines', name='SMA 50', line=dict(color='purple', width=2, dash='dash'))
+    return _figure(PRICE_LAYOUT, _ohlc_lines(dataframe, width) + [sma])
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['MACD'], name = 'RSI', marker_color='orange', line=dict(color='orange', width=2)))
-    
-    fig.add_trace(go.Scatter(x=dataframe['Date'], y=dataframe['MACD_Signal'], name = 'Overbought', marker_color='red', line=dict(color='red', width=1, dash='dash')))
-    c = ['red' if cl < 0 else 'green' for cl in macd_histogram]
 
-    fig.update_layout(
-        height = 200, plot_bgcolor = 'white', paper_bgcolor = '#e1efff', margin=dict(l=0, r=0, t=0, b=0), legend=dict(orientation="h", yanchor="top", y=1.02, xanchor="right", x=1)
-    )
-    return fig
+@traced()
+def MACD(dataframe, num_period, width=DEFAULT_CHART_WIDTH):
+    dataframe = filter_date(get_indicators(dataframe), num_period)
+    x, histogram = lttb(dataframe.index, dataframe['MACD_Histogram'], line_target(width))
+    return _figure(INDICATOR_LAYOUT, [
+        _line(dataframe.index, dataframe['MACD'], width, name = 'MACD', marker_color='orange', line=dict(color='orange', width=2)),
+        _line(dataframe.index, dataframe['MACD_Signal'], width, name = 'Signal', marker_color='red', line=dict(color='red', width=1, dash='dash')),
+        go.Bar(x=_dates(x), y=histogram, name = 'Histogram',
+               marker=dict(color=(histogram >= 0).astype(np.int8), colorscale=MACD_COLORSCALE, cmin=0, cmax=1)),
+    ])
 
 
 # Compatibility helpers (keeps the API used by pages/Stock_Analysis.py)
-def line_chart(dataframe, num_period=False):
-    return close_chart(dataframe, num_period=num_period)
+def line_chart(dataframe, num_period=False, width=DEFAULT_CHART_WIDTH):
+    return close_chart(dataframe, num_period=num_period, width=width)
 
 
-def moving_average(dataframe, num_period):
-    return Moving_Average(dataframe, num_period)
+def moving_average(dataframe, num_period, width=DEFAULT_CHART_WIDTH):
+    return Moving_Average(dataframe, num_period, width=width)
 
+@traced()
 def moving_average_forecast(forecast):
-    fig = go.Figure()
-
-    fig.add_trace(go.Scatter(x=forecast.index[:-30], y=forecast['Close'][:-30], mode='lines', name='Close Price', line=dict(color='#ff7f0e', width=2)))
-
-    fig.add_trace(go.Scatter(x=forecast.index[-31:], y=forecast['Close'].iloc[-31:], mode='lines', name='Forecasted Close Price', line=dict(color='purple', width=2)))
-
-    fig.update_xaxes(rangeslider_visible=True)
-    fig.update_layout(height = 500, margin=dict(l=0, r=20, t=20, b=0), plot_bgcolor = 'white', paper_bgcolor = '#e1efff', legend=dict(
-        yanchor="top",
-
-        xanchor="right"
-    ))
-
-    return fig
\ No newline at end of file
+    close = forecast['Close'].to_numpy(dtype=np.float64)
+    traces = [
+        go.Scatter(x=_dates(forecast.index[:-30]), y=close[:-30], mode='lines', name='Close Price', line=dict(color='#ff7f0e', width=2)),
+        go.Scatter(x=_dates(forecast.index[-31:]), y=close[-31:], mode='lines', name='Forecasted Close Price', line=dict(color='purple', width=2)),
+    ]
+
+    # Prediction intervals ('Lower 80%'/'Upper 80%', ...), widest first so narrower bands draw on top.
+    levels = sorted((c[len('Lower '):] for c in forecast.columns if c.startswith('Lower ')), key=lambda l: -float(l.rstrip('%')))
+    for level in levels:
+        band = forecast[[f'Lower {level}', f'Upper {level}']].dropna()
+        x = _dates(band.index)
+        traces.append(go.Scatter(x=x, y=band[f'Upper {level}'].to_numpy(dtype=np.float64), mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        traces.append(go.Scatter(x=x, y=band[f'Lower {level}'].to_numpy(dtype=np.float64), mode='lines', line=dict(width=0), fill='tonexty',
+                                 fillcolor='rgba(128, 0, 128, 0.15)', name=f'{level} interval'))
+
+    return _figure(PRICE_LAYOUT, traces)
+
+
+@traced()
+def forecast_comparison(paths, horizons=()):
+    # One line per ticker: forecast % change from its last 7-day mean, with the horizons marked.
+    x = _dates(paths.index)
+    traces = [go.Scatter(x=x, y=paths[ticker].to_numpy(dtype=np.float64), mode='lines', name=str(ticker), line=dict(width=2))
+              for ticker in paths.columns]
+    marks = [dict(type='line', yref='paper', y0=0, y1=1, x0=x[h - 1], x1=x[h - 1], line=dict(color='grey', width=1, dash='dash'))
+             for h in horizons if 0 < h <= len(paths)]
+    return _figure(go.Layout(COMPARISON_LAYOUT, shapes=marks) if marks else COMPARISON_LAYOUT, traces)
+
+
+# Streaming charts: built once from a ticker's current window, then extended in place with each
+# batch of new rows (pages.utils.streaming row tuples) instead of being rebuilt.
+STREAM_TRACES = {
+    'price': ('Close', 'SMA_50'),
+    'rsi': ('RSI',),
+    'macd': ('MACD', 'MACD_Signal', 'MACD_Histogram'),
+}
+
+
+def stream_figures(frame):
+    x = _dates(frame.index)
+
+    def column(name):
+        return frame[name].to_numpy(dtype=np.float64)
+
+    return {
+        'price': _figure(STREAM_PRICE_LAYOUT, [
+            go.Scatter(x=x, y=column('Close'), mode='lines', name='Close', line=dict(color='#0078ff', width=2)),
+            go.Scatter(x=x, y=column('SMA_50'), mode='lines', name='SMA 50', line=dict(color='purple', width=1)),
+        ]),
+        'rsi': _figure(STREAM_RSI_LAYOUT, [go.Scatter(x=x, y=column('RSI'), mode='lines', name='RSI', line=dict(color='orange', width=2))]),
+        'macd': _figure(STREAM_MACD_LAYOUT, [
+            go.Scatter(x=x, y=column('MACD'), mode='lines', name='MACD', line=dict(color='orange', width=2)),
+            go.Scatter(x=x, y=column('MACD_Signal'), mode='lines', name='Signal', line=dict(color='red', width=1, dash='dash')),
+            go.Bar(x=x, y=column('MACD_Histogram'), name='Histogram', marker_color='grey'),
+        ]),
+    }
+
+
+def extend_stream_figures(figures, rows, window, columns):
+    # Appends the new rows' points to every trace, keeping the last `window`; nothing is recomputed.
+    if not rows:
+        return figures
+    # NumPy arrays: plotly validates those wholesale instead of element by element.
+    x = _dates([row[0] for row in rows])
+    keep = max(window - len(x), 0)
+    for name, traces in STREAM_TRACES.items():
+        fig = figures[name]
+        with fig.batch_update():
+            for trace, column in zip(fig.data, traces):
+                position = columns.index(column)
+                y = np.array([row[position] for row in rows], dtype=np.float64)
+                old_x, old_y = np.asarray(trace.x, dtype=np.float64), np.asarray(trace.y, dtype=np.float64)
+                trace.x = np.concatenate([old_x[max(len(old_x) - keep, 0):] if keep else old_x[:0], x])
+                trace.y = np.concatenate([old_y[max(len(old_y) - keep, 0):] if keep else old_y[:0], y])
+    return figures
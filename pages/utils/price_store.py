@@ -0,0 +1,256 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from pages.utils.fetcher import fetch_history, fetch_histories
+from pages.utils.compact_prices import get_price_cache
+from pages.utils import shared_prices
+
+# Local columnar OHLCV store: one file per ticker holding its full daily history.
+# Reads are local; the network is only hit to append bars newer than the last stored date.
+STORE_DIR = os.environ.get(
+    "PRICE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".price_store"),
+)
+
+# Don't ask Yahoo for new bars more often than this (seconds) per ticker.
+REFRESH_INTERVAL = int(os.environ.get("PRICE_STORE_REFRESH_SECONDS", 60 * 60))
+
+# Bulk refresh: tickers per batched request, and batched requests in flight at once.
+BULK_CHUNK_SIZE = int(os.environ.get("PRICE_STORE_BULK_CHUNK", 100))
+BULK_WORKERS = int(os.environ.get("PRICE_STORE_BULK_WORKERS", 4))
+WATCHLIST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "watchlist.txt")
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+try:
+    import pyarrow  # noqa: F401
+    _EXT = ".parquet"
+except ImportError:
+    # Parquet needs pyarrow; keep the store working without it.
+    _EXT = ".pkl"
+
+
+def normalize_ohlc(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    # yfinance can return MultiIndex columns even for a single ticker.
+    # For this app we expect simple columns: Open/High/Low/Close/Volume.
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return pd.DataFrame()
+
+    if isinstance(df.columns, pd.MultiIndex):
+        # Common case: level0 = [Open, High, Low, Close, Volume], level1 = [<ticker>]
+        # If only one ticker present, drop the ticker level.
+        if df.columns.nlevels >= 2:
+            level_1_vals = df.columns.get_level_values(-1)
+            if len(set(map(str, level_1_vals))) == 1:
+                df = df.copy()
+                df.columns = df.columns.get_level_values(0)
+            else:
+                # Multiple tickers: keep only the selected symbol if present.
+                try:
+                    df = df.xs(symbol, axis=1, level=-1, drop_level=True)
+                except Exception:
+                    return pd.DataFrame()
+
+    # Some yfinance outputs use lowercase or include 'Adj Close'; standardize minimally.
+    rename_map = {c: str(c).title() for c in df.columns}
+    df = df.rename(columns=rename_map)
+    return df
+
+
+def _partition_path(symbol: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._^=-]", "_", symbol.upper())
+    return os.path.join(STORE_DIR, safe + _EXT)
+
+
+def _to_store_frame(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    df = normalize_ohlc(df, symbol)
+    if df.empty:
+        return df
+    df = df[[c for c in OHLCV_COLUMNS if c in df.columns]]
+    index = pd.DatetimeIndex(df.index)
+    # Ticker.history returns exchange-local tz-aware stamps; yf.download returns naive dates.
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df = df.set_axis(index.normalize(), axis=0)
+    df.index.name = "Date"
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+def load_prices(symbol: str) -> pd.DataFrame:
+    path = _partition_path(symbol)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        if _EXT == ".parquet":
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+    except Exception:
+        # Corrupt/partial partition: treat as missing so it gets rebuilt.
+        return pd.DataFrame()
+
+
+def _write_prices(symbol: str, df: pd.DataFrame) -> None:
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = _partition_path(symbol)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if _EXT == ".parquet":
+        df.to_parquet(tmp)
+    else:
+        df.to_pickle(tmp)
+    # Atomic swap so concurrent sessions never read a half-written file.
+    os.replace(tmp, path)
+
+
+def _download(symbol: str, start=None) -> pd.DataFrame:
+    # Retries, backoff, request coalescing and the bad-ticker cache live in the fetch layer.
+    return fetch_history(symbol, start=start)
+
+
+def _is_fresh(symbol: str) -> bool:
+    path = _partition_path(symbol)
+    return os.path.exists(path) and time.time() - os.path.getmtime(path) < REFRESH_INTERVAL
+
+
+def _merge_and_save(symbol: str, stored: pd.DataFrame, downloaded: pd.DataFrame) -> pd.DataFrame:
+    new_bars = _to_store_frame(downloaded, symbol)
+    if stored.empty:
+        merged = new_bars
+    elif new_bars.empty:
+        merged = stored
+    else:
+        merged = pd.concat([stored[stored.index < new_bars.index[0]], new_bars])
+
+    if merged.empty:
+        return stored
+
+    if merged is stored:
+        # Nothing new upstream; just record that we checked.
+        os.utime(_partition_path(symbol))
+    else:
+        _write_prices(symbol, merged)
+    return merged
+
+
+def _resume_date(stored: pd.DataFrame) -> str:
+    # Re-request the last stored bar too: if it was written intraday it is still partial.
+    return stored.index[-1].strftime("%Y-%m-%d")
+
+
+def refresh_prices(symbol: str, force: bool = False) -> pd.DataFrame:
+    stored = load_prices(symbol)
+    if not force and not stored.empty and _is_fresh(symbol):
+        return stored
+
+    if stored.empty:
+        return _merge_and_save(symbol, stored, _download(symbol))
+    return _merge_and_save(symbol, stored, _download(symbol, start=_resume_date(stored)))
+
+
+def refresh_many(symbols, chunk_size: int = BULK_CHUNK_SIZE, max_workers: int = BULK_WORKERS,
+                 force: bool = False) -> dict:
+    # Bulk counterpart of refresh_prices: stale symbols are fetched in batched requests of
+    # `chunk_size` tickers, at most `max_workers` batches in flight at once.
+    symbols = [s.strip().upper() for s in dict.fromkeys(symbols) if s and s.strip()]
+    stored = {s: load_prices(s) for s in symbols}
+    result = {s: df for s, df in stored.items() if not df.empty and not force and _is_fresh(s)}
+
+    # Symbols with history resume from the oldest last-bar in their batch; new ones get everything.
+    stale = [s for s in symbols if s not in result]
+    existing = [s for s in stale if not stored[s].empty]
+    new = [s for s in stale if stored[s].empty]
+    batches = [(existing[i:i + chunk_size], True) for i in range(0, len(existing), chunk_size)]
+    batches += [(new[i:i + chunk_size], False) for i in range(0, len(new), chunk_size)]
+
+    def run(batch):
+        chunk, incremental = batch
+        start = min(_resume_date(stored[s]) for s in chunk) if incremental else None
+        frames = fetch_histories(chunk, start=start)
+        return {s: _merge_and_save(s, stored[s], frames.get(s, pd.DataFrame())) for s in chunk}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for merged in pool.map(run, batches):
+            result.update(merged)
+    return {s: result[s] for s in symbols if s in result and not result[s].empty}
+
+
+def load_watchlist(path: str = WATCHLIST_FILE) -> list:
+    # WATCHLIST="AAPL,MSFT,..." or one ticker per line in watchlist.txt (# comments allowed).
+    symbols = [s for s in os.environ.get("WATCHLIST", "").split(",") if s.strip()]
+    if not symbols and os.path.exists(path):
+        with open(path) as fh:
+            symbols = [line.split("#")[0].strip() for line in fh]
+    return [s.strip().upper() for s in symbols if s.strip()]
+
+
+def warm_cache(symbols=None) -> dict:
+    symbols = load_watchlist() if symbols is None else symbols
+    if not symbols:
+        return {}
+    return refresh_many(symbols)
+
+
+def _version(symbol: str):
+    try:
+        return os.stat(_partition_path(symbol)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _between(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    lo = 0 if start is None else int(df.index.searchsorted(pd.Timestamp(start)))
+    hi = len(df) if end is None else int(df.index.searchsorted(pd.Timestamp(end)))
+    return df.iloc[lo:hi]
+
+
+def get_prices(symbol: str, start=None, end=None, precise: bool = False) -> pd.DataFrame:
+    # Reads are served from the compact in-memory cache (float32 prices, read-only views) while
+    # the partition is fresh and unchanged; that is precise enough to draw but not to model or
+    # print (712345.67 reads back as 712345.6875). Pass precise=True for the stored float64 values.
+    # Match yf.download: `end` is exclusive.
+    # With SHARED_PRICE_DIR set, tickers the shared writer maintains are read from its memory-mapped
+    # files (float64) and never touch the network from this process.
+    shared = shared_prices.read_prices(symbol, start, end)
+    if shared is not None:
+        return shared
+    if precise:
+        return _between(refresh_prices(symbol), start, end).copy()
+    key = symbol.strip().upper()
+    cache = get_price_cache()
+    compact = cache.get(key, _version(symbol)) if _is_fresh(symbol) else None
+    if compact is None:
+        df = refresh_prices(symbol)
+        if df.empty:
+            return df
+        compact = cache.put(key, _version(symbol), df)
+    return compact.to_frame(start, end)
+
+
+def get_stored_column(symbol: str, column: str = "Close", start=None, end=None):
+    # (dates, values) arrays of one column from whatever the shared files or the local store hold
+    # right now, or None. Never hits the network and builds no DataFrame: for bulk readers such
+    # as the screener, which refresh through refresh_many instead of per ticker.
+    shared = shared_prices.read_column(symbol, column, start, end)
+    if shared is not None:
+        return shared
+    version = _version(symbol)
+    if version is None:
+        return None
+    key = symbol.strip().upper()
+    cache = get_price_cache()
+    compact = cache.get(key, version)
+    if compact is None:
+        df = load_prices(symbol)
+        if df.empty or column not in df.columns:
+            return None
+        compact = cache.put(key, version, df)
+    return compact.column(column, start, end)
+
+
+def price_version(symbol: str):
+    # Changes whenever the prices get_stored_column returns for this ticker can have changed.
+    return shared_prices.shared_version(symbol), _version(symbol)
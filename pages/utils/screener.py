@@ -0,0 +1,215 @@
+import ast
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from pages.utils.indicators import compute_indicator_matrix, INDICATOR_COLUMNS
+from pages.utils.price_store import get_stored_column, price_version
+from pages.utils.tracing import traced, count
+
+# Multi-ticker screener. A universe's closes are held as one tickers x dates matrix with every
+# indicator as a matrix of the same shape, so a condition such as
+#   RSI < 30 and close > SMA_50
+#   crossed_above(MACD, signal)
+# is a handful of whole-array operations over all tickers and dates instead of a loop per ticker.
+# The matrices are built once per universe and data version and then reused by every screen.
+# Reads never hit the network; refresh the universe with price_store.refresh_many.
+LOOKBACK_DAYS = int(os.environ.get("SCREENER_LOOKBACK_DAYS", 730))
+SCREEN_COLUMNS = ("Close",) + INDICATOR_COLUMNS
+
+# Names usable in conditions (case-insensitive) -> matrix.
+FIELDS = {
+    "close": "Close",
+    "rsi": "RSI",
+    "sma_50": "SMA_50",
+    "sma": "SMA_50",
+    "macd": "MACD",
+    "signal": "MACD_Signal",
+    "macd_signal": "MACD_Signal",
+    "histogram": "MACD_Histogram",
+    "macd_histogram": "MACD_Histogram",
+}
+
+_universe_cache = OrderedDict()
+_universe_lock = threading.Lock()
+_MAX_UNIVERSES = 4
+
+
+class Universe:
+    __slots__ = ("symbols", "dates", "last_dates", "fields", "missing")
+
+    def __init__(self, symbols, dates, last_dates, fields, missing):
+        self.symbols = symbols          # row labels
+        self.dates = dates              # column labels (datetime64)
+        self.last_dates = last_dates    # each ticker's own last bar
+        self.fields = fields            # name -> tickers x dates float64 matrix
+        self.missing = missing          # requested tickers with no stored prices
+
+
+def _forward_fill(matrix: np.ndarray) -> np.ndarray:
+    # Carries each row's last value over dates that row didn't trade; leading NaNs stay.
+    valid = ~np.isnan(matrix)
+    index = np.where(valid, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = matrix[np.arange(matrix.shape[0])[:, None], index]
+    filled[np.cumsum(valid, axis=1) == 0] = np.nan
+    return filled
+
+
+@traced("screener.build_universe")
+def build_universe(symbols, lookback_days=LOOKBACK_DAYS) -> Universe:
+    start = pd.Timestamp.today().normalize() - pd.Timedelta(days=lookback_days)
+    closes, missing = {}, []
+    for symbol in symbols:
+        column = get_stored_column(symbol, "Close", start=start)
+        if column is None or not len(column[0]):
+            missing.append(symbol)
+            continue
+        closes[symbol] = column
+
+    names = list(closes)
+    dates = np.unique(np.concatenate([d for d, _ in closes.values()])) if names else np.array([], "M8[ns]")
+    matrix = np.full((len(names), len(dates)), np.nan)
+    last_dates = np.empty(len(names), dtype=dates.dtype)
+    for row, (day, close) in enumerate(closes.values()):
+        matrix[row, np.searchsorted(dates, day)] = close
+        last_dates[row] = day[-1]
+
+    matrix = _forward_fill(matrix)
+    fields = {"Close": matrix, **compute_indicator_matrix(matrix)}
+    for values in fields.values():
+        values.flags.writeable = False
+    return Universe(names, dates, last_dates, fields, missing)
+
+
+def get_universe(symbols, lookback_days=LOOKBACK_DAYS) -> Universe:
+    # Cached per universe; rebuilt when any ticker's stored prices have changed.
+    symbols = tuple(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    key = (symbols, lookback_days, pd.Timestamp.today().date())
+    versions = tuple(price_version(s) for s in symbols)
+    with _universe_lock:
+        entry = _universe_cache.get(key)
+        if entry is not None and entry[0] == versions:
+            _universe_cache.move_to_end(key)
+            count("screener_universe_hits")
+            return entry[1]
+    universe = build_universe(symbols, lookback_days)
+    with _universe_lock:
+        _universe_cache[key] = (versions, universe)
+        while len(_universe_cache) > _MAX_UNIVERSES:
+            _universe_cache.popitem(last=False)
+    return universe
+
+
+def _crossed_above(a, b):
+    # True on the session `a` went from at/below `b` to above it.
+    above = np.asarray(a > b)
+    if above.ndim != 2:
+        raise ValueError("crossed_above/crossed_below need a field as one of their arguments")
+    out = np.zeros(above.shape, dtype=bool)
+    out[:, 1:] = above[:, 1:] & np.asarray(a <= b)[:, :-1]
+    return out
+
+
+def _crossed_below(a, b):
+    return _crossed_above(b, a)
+
+
+FUNCTIONS = {
+    "crossed_above": _crossed_above,
+    "crossed_below": _crossed_below,
+    "crossed": lambda a, b: _crossed_above(a, b) | _crossed_below(a, b),
+}
+
+_COMPARE = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def _evaluate(node, fields):
+    # Restricted evaluator: fields, numbers, arithmetic, comparisons, and/or/not, FUNCTIONS.
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, fields)
+    if isinstance(node, ast.BoolOp):
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        values = [np.asarray(_evaluate(v, fields), dtype=bool) for v in node.values]
+        result = values[0]
+        for value in values[1:]:
+            result = combine(result, value)
+        return result
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return np.logical_not(_evaluate(node.operand, fields))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return np.negative(_evaluate(node.operand, fields))
+    if isinstance(node, ast.Compare):
+        left, result = _evaluate(node.left, fields), True
+        for op, right_node in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARE:
+                raise ValueError(f"unsupported comparison: {type(op).__name__}")
+            right = _evaluate(right_node, fields)
+            result = np.logical_and(result, _COMPARE[type(op)](left, right))
+            left = right
+        return result
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        return _ARITHMETIC[type(node.op)](_evaluate(node.left, fields), _evaluate(node.right, fields))
+    if isinstance(node, ast.Name):
+        name = FIELDS.get(node.id.lower())
+        if name is None:
+            raise ValueError(f"unknown field {node.id!r}; use one of {', '.join(sorted(FIELDS))}")
+        return fields[name]
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return float(node.value)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        func = FUNCTIONS.get(node.func.id.lower())
+        if func is None:
+            raise ValueError(f"unknown function {node.func.id!r}; use one of {', '.join(FUNCTIONS)}")
+        if len(node.args) != 2:
+            raise ValueError(f"{node.func.id} takes two arguments")
+        return func(*(_evaluate(arg, fields) for arg in node.args))
+    raise ValueError(f"unsupported expression: {type(node).__name__}")
+
+
+def parse_condition(condition: str):
+    try:
+        return ast.parse(condition.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise ValueError(f"invalid condition: {exc.msg}") from None
+
+
+def evaluate_condition(condition: str, universe: Universe) -> np.ndarray:
+    # tickers x dates boolean matrix of where `condition` holds (NaN comparisons are False).
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mask = _evaluate(parse_condition(condition), universe.fields)
+    return np.broadcast_to(np.asarray(mask, dtype=bool), (len(universe.symbols), len(universe.dates)))
+
+
+@traced()
+def screen(condition: str, symbols, within: int = 1, lookback_days=LOOKBACK_DAYS) -> dict:
+    # Tickers for which `condition` held on any of the last `within` sessions of the universe.
+    started = time.perf_counter()
+    universe = get_universe(symbols, lookback_days)
+    table = pd.DataFrame(columns=["As Of", *SCREEN_COLUMNS], index=pd.Index([], name="Ticker"))
+    if not universe.symbols or not len(universe.dates):
+        return {"table": table, "universe": 0, "as_of": None, "missing": universe.missing,
+                "seconds": round(time.perf_counter() - started, 4)}
+
+    mask = evaluate_condition(condition, universe)
+    matched = np.flatnonzero(mask[:, -max(int(within), 1):].any(axis=1))
+    count("screener_matches", len(matched))
+
+    table = pd.DataFrame({name: universe.fields[name][matched, -1] for name in SCREEN_COLUMNS},
+                         index=pd.Index([universe.symbols[i] for i in matched], name="Ticker"))
+    table.insert(0, "As Of", pd.DatetimeIndex(universe.last_dates[matched]).date)
+    return {
+        "table": table,
+        "universe": len(universe.symbols),
+        "as_of": pd.Timestamp(universe.dates[-1]).date(),
+        "missing": universe.missing,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
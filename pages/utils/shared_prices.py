@@ -0,0 +1,237 @@
+import argparse
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; run a single writer by convention there.
+    fcntl = None
+
+# Shared, memory-mapped price history for running several Streamlit processes on one host.
+# One append-only file per ticker: a 64-byte header (magic, committed row count) followed by
+# fixed-size bar records. A single writer appends completed sessions and only then bumps the
+# row count, so readers never see a partial record; every worker maps the same pages read-only.
+#   python -m pages.utils.shared_prices                  # append new bars for the watchlist once
+#   python -m pages.utils.shared_prices AAPL --loop 900  # keep refreshing every 15 minutes
+# Workers read it when SHARED_PRICE_DIR points at the writer's directory. A session's bar is
+# only written once that session has closed (in the market's time zone, plus a margin for the
+# final bar to settle), so the shared history ends at the last completed session.
+SHARED_DIR = os.environ.get("SHARED_PRICE_DIR")
+MARKET_TZ = ZoneInfo(os.environ.get("SHARED_PRICE_TZ", "America/New_York"))
+MARKET_CLOSE = os.environ.get("SHARED_PRICE_CLOSE", "16:00")
+SETTLE_MINUTES = 15
+
+MAGIC = b"PXBARS02"
+HEADER = struct.Struct("<8sq")
+HEADER_SIZE = 64
+RECORD = np.dtype([
+    ("Date", "<M8[us]"),
+    ("Open", "<f8"),
+    ("High", "<f8"),
+    ("Low", "<f8"),
+    ("Close", "<f8"),
+    ("Adj Close", "<f8"),
+    ("Volume", "<u8"),
+])
+
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def _bars_path(symbol: str, directory=None) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._^=-]", "_", symbol.upper())
+    return os.path.join(directory or SHARED_DIR, safe + ".bars")
+
+
+def _committed_rows(path: str) -> int:
+    with open(path, "rb") as fh:
+        magic, rows = HEADER.unpack(fh.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a shared price file")
+    return rows
+
+
+def _records(path: str):
+    # Memory map of the committed rows; remapped when the writer has appended or has rebuilt the
+    # file (a rename puts a new inode in place, possibly with the same row count).
+    stat = os.stat(path)
+    version = (stat.st_ino, stat.st_mtime_ns, _committed_rows(path))
+    with _maps_lock:
+        cached = _maps.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    rows = version[2]
+    records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(rows,)) if rows else \
+        np.empty(0, dtype=RECORD)
+    with _maps_lock:
+        _maps[path] = (version, records)
+    return records
+
+
+def read_prices(symbol: str, start=None, end=None, directory=None):
+    # [start, end) view of the shared history, or None if this ticker isn't in the shared store.
+    if not (directory or SHARED_DIR):
+        return None
+    path = _bars_path(symbol, directory)
+    try:
+        records = _records(path)
+    except (OSError, ValueError):
+        return None
+    if not len(records):
+        return None
+
+    dates = records["Date"]
+    lo = 0 if start is None else int(dates.searchsorted(np.datetime64(pd.Timestamp(start))))
+    hi = len(records) if end is None else int(dates.searchsorted(np.datetime64(pd.Timestamp(end))))
+    rows = records[lo:hi]
+    columns = [name for name in RECORD.names if name != "Date"]
+    return pd.DataFrame({name: rows[name] for name in columns},
+                        index=pd.DatetimeIndex(rows["Date"], name="Date"), copy=False)
+
+
+def read_column(symbol: str, name: str, start=None, end=None, directory=None):
+    # (dates, values) of one column over [start, end), or None like read_prices.
+    if not (directory or SHARED_DIR):
+        return None
+    try:
+        records = _records(_bars_path(symbol, directory))
+    except (OSError, ValueError):
+        return None
+    if not len(records):
+        return None
+    dates = records["Date"]
+    lo = 0 if start is None else int(dates.searchsorted(np.datetime64(pd.Timestamp(start))))
+    hi = len(records) if end is None else int(dates.searchsorted(np.datetime64(pd.Timestamp(end))))
+    return dates[lo:hi], records[name][lo:hi]
+
+
+def shared_version(symbol: str, directory=None):
+    # Changes whenever the writer appends; None if this ticker isn't in the shared store.
+    if not (directory or SHARED_DIR):
+        return None
+    try:
+        return os.stat(_bars_path(symbol, directory)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _to_records(df: pd.DataFrame) -> np.ndarray:
+    records = np.zeros(len(df), dtype=RECORD)
+    records["Date"] = pd.DatetimeIndex(df.index).tz_localize(None).values
+    for name in ("Open", "High", "Low", "Close"):
+        records[name] = df[name].to_numpy(dtype=np.float64)
+    records["Adj Close"] = df["Adj Close" if "Adj Close" in df.columns else "Close"].to_numpy(dtype=np.float64)
+    if "Volume" in df.columns:
+        records["Volume"] = df["Volume"].fillna(0).to_numpy()
+    return records
+
+
+def last_completed_session(now=None) -> pd.Timestamp:
+    # Date of the newest session whose daily bar is final: today once MARKET_CLOSE plus the
+    # settling margin has passed in MARKET_TZ, otherwise the day before. Naive `now` is market time.
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now)
+    now = now.tz_localize(MARKET_TZ) if now.tzinfo is None else now.tz_convert(MARKET_TZ)
+    hour, minute = map(int, MARKET_CLOSE.split(":"))
+    closed = now.normalize() + pd.Timedelta(hours=hour, minutes=minute + SETTLE_MINUTES)
+    session = now.normalize().tz_localize(None)
+    return session if now >= closed else session - pd.Timedelta(days=1)
+
+
+def append_prices(symbol: str, df: pd.DataFrame, directory=None, now=None) -> int:
+    # Writer side: appends bars after the last stored date, up to the last completed session as of
+    # `now`. Returns rows added.
+    directory = directory or SHARED_DIR
+    path = _bars_path(symbol, directory)
+    try:
+        rows = _committed_rows(path) if os.path.exists(path) else 0
+    except ValueError:
+        # Written in the older float32 format: rebuilt from the full history below.
+        rows = None
+    if rows:
+        last = _records(path)["Date"][-1]
+        df = df[df.index > pd.Timestamp(last)]
+    df = df[df.index <= last_completed_session(now)]
+    if df.empty:
+        return 0
+
+    records = _to_records(df)
+    if rows is None or not os.path.exists(path):
+        # New ticker: build the whole file aside and rename it into place.
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(HEADER.pack(MAGIC, len(records)).ljust(HEADER_SIZE, b"\0"))
+            fh.write(records.tobytes())
+        os.replace(tmp, path)
+        return len(records)
+
+    with open(path, "r+b") as fh:
+        # Records first, then the row count that makes them visible.
+        fh.seek(HEADER_SIZE + rows * RECORD.itemsize)
+        fh.write(records.tobytes())
+        fh.flush()
+        os.fsync(fh.fileno())
+        fh.seek(0)
+        fh.write(HEADER.pack(MAGIC, rows + len(records)))
+        fh.flush()
+    return len(records)
+
+
+def _writer_lock(directory):
+    os.makedirs(directory, exist_ok=True)
+    handle = open(os.path.join(directory, ".writer.lock"), "w")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            raise RuntimeError(f"another writer is already refreshing {directory}")
+    return handle
+
+
+def refresh_shared(symbols, directory=None) -> dict:
+    # Pulls the symbols through the local price store (batched downloads), then appends.
+    from pages.utils.price_store import refresh_many
+
+    directory = directory or SHARED_DIR
+    lock = _writer_lock(directory)
+    try:
+        frames = refresh_many(symbols, force=True)
+        return {symbol: append_prices(symbol, df, directory) for symbol, df in frames.items()}
+    finally:
+        lock.close()
+
+
+def main(argv=None):
+    from pages.utils.price_store import load_watchlist
+
+    parser = argparse.ArgumentParser(description="Refresh the shared memory-mapped price files (single writer).")
+    parser.add_argument("tickers", nargs="*", help="ticker symbols (default: the watchlist)")
+    parser.add_argument("--dir", default=SHARED_DIR, help="shared directory (default: $SHARED_PRICE_DIR)")
+    parser.add_argument("--loop", type=float, default=None, metavar="SECONDS", help="refresh every SECONDS")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("set SHARED_PRICE_DIR or pass --dir")
+
+    while True:
+        tickers = args.tickers or load_watchlist()
+        if not tickers:
+            parser.error("no tickers given and the watchlist is empty")
+        added = refresh_shared(tickers, args.dir)
+        print(f"appended {sum(added.values())} bars across {len(added)} tickers", flush=True)
+        if args.loop is None:
+            return 0
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
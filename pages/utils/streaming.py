@@ -0,0 +1,189 @@
+import math
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from pages.utils.fetcher import split_tickers
+from pages.utils.indicators import RSI_LENGTH, SMA_LENGTH, MACD_FAST, MACD_SLOW, MACD_SIGNAL, INDICATOR_COLUMNS
+from pages.utils.price_store import normalize_ohlc
+from pages.utils.tracing import traced, count
+
+# Intraday streaming: bars arrive from a feed, every ticker's indicators are advanced by one O(1)
+# step per new bar (same definitions as indicators.py, so a streamed value equals recomputing the
+# whole series), and only the new rows are handed to the charts.
+# Feeds implement poll(symbols) -> {symbol: DataFrame of bars newer than the previous poll}.
+STREAM_INTERVALS = ("1m", "5m")
+STREAM_WINDOW = 390          # bars kept per ticker for the charts: one regular session of 1m bars
+BAR_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+STREAM_COLUMNS = ("Datetime",) + BAR_COLUMNS + INDICATOR_COLUMNS
+
+
+class _Ema:
+    # SMA-seeded EMA, one value at a time.
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = math.nan
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.length:
+            self.total += x
+        elif self.count == self.length:
+            self.value = (self.total + x) / self.length
+        else:
+            self.value = self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+
+class IndicatorState:
+    # RSI (Wilder, bias-corrected), SMA and MACD state for one ticker; update() is O(1) per bar.
+    def __init__(self):
+        self.window = deque(maxlen=SMA_LENGTH)
+        self.window_sum = 0.0
+        self.prev_close = None
+        self.decay = 1.0 - 1.0 / RSI_LENGTH
+        self.gain = self.loss = 0.0
+        self.changes = 0
+        self.fast, self.slow, self.signal = _Ema(MACD_FAST), _Ema(MACD_SLOW), _Ema(MACD_SIGNAL)
+
+    def update(self, close):
+        if len(self.window) == SMA_LENGTH:
+            self.window_sum -= self.window[0]
+        self.window.append(close)
+        self.window_sum += close
+        sma = self.window_sum / SMA_LENGTH if len(self.window) == SMA_LENGTH else math.nan
+
+        rsi = math.nan
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            self.gain = max(change, 0.0) + self.decay * self.gain
+            self.loss = max(-change, 0.0) + self.decay * self.loss
+            self.changes += 1
+            if self.changes >= RSI_LENGTH and self.gain + self.loss > 0:
+                rsi = 100.0 * self.gain / (self.gain + self.loss)
+        self.prev_close = close
+
+        line = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(line) if not math.isnan(line) else math.nan
+        return rsi, sma, line, signal, line - signal
+
+
+class TickerStream:
+    def __init__(self, symbol, window=STREAM_WINDOW):
+        self.symbol = symbol
+        self.state = IndicatorState()
+        self.rows = deque(maxlen=window)
+        self.last_time = None
+
+    def push(self, bars: pd.DataFrame) -> list:
+        # Advances the indicators over the new bars and returns the new chart rows.
+        if self.last_time is not None and len(bars) and bars.index[0] <= self.last_time:
+            bars = bars[bars.index > self.last_time]
+        values = bars[list(BAR_COLUMNS)].to_numpy(dtype=np.float64)
+        new_rows = []
+        for when, bar in zip(bars.index, values):
+            row = (when, *bar, *self.state.update(bar[3]))
+            self.rows.append(row)
+            new_rows.append(row)
+        if len(bars):
+            self.last_time = bars.index[-1]
+        return new_rows
+
+    def frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame(list(self.rows), columns=STREAM_COLUMNS)
+        return frame.set_index("Datetime")
+
+
+class StreamSession:
+    def __init__(self, feed, symbols, window=STREAM_WINDOW):
+        self.feed = feed
+        self.streams = {s: TickerStream(s, window) for s in dict.fromkeys(symbols)}
+
+    @traced("stream.step")
+    def step(self) -> dict:
+        # One poll of the feed; returns {symbol: new rows} for the symbols that got new bars.
+        updates = {}
+        for symbol, bars in self.feed.poll(list(self.streams)).items():
+            stream = self.streams.get(symbol)
+            if stream is None or bars is None or bars.empty:
+                continue
+            rows = stream.push(bars)
+            if rows:
+                updates[symbol] = rows
+        count("stream_bars", sum(len(rows) for rows in updates.values()))
+        return updates
+
+    def latest(self) -> pd.DataFrame:
+        rows = {s: stream.rows[-1] for s, stream in self.streams.items() if stream.rows}
+        frame = pd.DataFrame(list(rows.values()), columns=STREAM_COLUMNS, index=pd.Index(list(rows), name="Ticker"))
+        return frame.drop(columns="Datetime")
+
+
+class ReplayFeed:
+    # Replays recorded intraday bars from a CSV or Parquet file (or a DataFrame), `bars_per_poll`
+    # bars per symbol per poll. Long format: Datetime, Symbol, Open, High, Low, Close, Volume;
+    # a file without a Symbol column is one ticker's bars, named by `symbol`.
+    def __init__(self, source, bars_per_poll=1, symbol=None):
+        if isinstance(source, pd.DataFrame):
+            frame = source
+        elif str(source).lower().endswith((".parquet", ".pq")):
+            frame = pd.read_parquet(source)
+        else:
+            frame = pd.read_csv(source)
+        frame = frame.rename(columns=lambda c: str(c).title())
+        if "Datetime" not in frame.columns:
+            # yfinance saves the timestamps as the index ('Datetime' or 'Date') or first column.
+            frame = frame.reset_index() if frame.index.name else frame
+            frame = frame.rename(columns={frame.columns[0]: "Datetime"})
+        frame["Datetime"] = pd.to_datetime(frame["Datetime"])
+        if "Symbol" not in frame.columns:
+            frame["Symbol"] = symbol or "REPLAY"
+        self.bars = {
+            str(sym).upper(): group.set_index("Datetime").sort_index()[list(BAR_COLUMNS)]
+            for sym, group in frame.groupby("Symbol")
+        }
+        self.bars_per_poll = bars_per_poll
+        self.cursor = dict.fromkeys(self.bars, 0)
+
+    @property
+    def symbols(self) -> list:
+        return list(self.bars)
+
+    def poll(self, symbols) -> dict:
+        updates = {}
+        for symbol in symbols:
+            bars = self.bars.get(symbol)
+            if bars is None:
+                continue
+            start = self.cursor[symbol]
+            self.cursor[symbol] = min(start + self.bars_per_poll, len(bars))
+            updates[symbol] = bars.iloc[start:self.cursor[symbol]]
+        return updates
+
+
+class YahooFeed:
+    # Live 1m/5m bars: one batched download for all symbols at most every `min_interval` seconds.
+    # The newest bar is still forming, so it is held back until the next one appears.
+    def __init__(self, interval="1m", min_interval=15.0, clock=time.monotonic):
+        if interval not in STREAM_INTERVALS:
+            raise ValueError(f"interval must be one of {STREAM_INTERVALS}, got {interval!r}")
+        self.interval = interval
+        self.min_interval = min_interval
+        self._clock = clock
+        self._last_poll = None
+
+    def poll(self, symbols) -> dict:
+        now = self._clock()
+        if self._last_poll is not None and now - self._last_poll < self.min_interval:
+            return {}
+        self._last_poll = now
+        data = yf.download(list(symbols), period="1d", interval=self.interval, progress=False, threads=True,
+                           group_by="ticker", auto_adjust=False, actions=False)
+        frames = split_tickers(data, list(symbols))
+        return {s: normalize_ohlc(df, s).dropna(subset=["Close"]).iloc[:-1] for s, df in frames.items()}
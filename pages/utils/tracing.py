@@ -0,0 +1,173 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Lightweight spans and counters for the hot paths.
+# - every span is added to the current page run (start_request) for the debug timing panel
+# - process-wide totals are kept for Prometheus text export (prometheus_text / TRACE_PROM_FILE)
+# - with TRACE_JSONL set, every finished span is appended to that file as one JSON line
+JSONL_PATH = os.environ.get("TRACE_JSONL")
+PROM_PATH = os.environ.get("TRACE_PROM_FILE")
+METRIC_PREFIX = "stock_app"
+
+_current_request = ContextVar("trace_request", default=None)
+_depth = ContextVar("trace_depth", default=0)
+_lock = threading.Lock()
+_span_totals = defaultdict(lambda: [0.0, 0])
+_counters = defaultdict(float)
+
+
+class Request:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(float)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def start_request(name: str) -> Request:
+    # Call at the top of a page: spans recorded during this script run are collected on it.
+    request = Request(name)
+    _current_request.set(request)
+    return request
+
+
+def current_request():
+    return _current_request.get()
+
+
+def _record(entry: dict) -> None:
+    request = _current_request.get()
+    if request is not None:
+        request.spans.append(entry)
+    with _lock:
+        totals = _span_totals[entry["span"]]
+        totals[0] += entry["seconds"]
+        totals[1] += 1
+    if JSONL_PATH:
+        with _lock, open(JSONL_PATH, "a") as fh:
+            fh.write(json.dumps(entry, default=str) + "\n")
+
+
+@contextmanager
+def span(name: str, **attrs):
+    request = _current_request.get()
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        _depth.reset(token)
+        entry = {
+            "ts": time.time(),
+            "request": request.name if request is not None else None,
+            "span": name,
+            "seconds": round(time.perf_counter() - started, 6),
+            "depth": depth,
+        }
+        if request is not None:
+            entry["offset"] = round(started - request.started, 6)
+        if attrs:
+            entry["attrs"] = attrs
+        if error:
+            entry["error"] = error
+        _record(entry)
+
+
+def traced(name=None):
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: float = 1) -> None:
+    request = _current_request.get()
+    if request is not None:
+        request.counters[name] += value
+    with _lock:
+        _counters[name] += value
+
+
+def to_jsonl(spans) -> str:
+    return "".join(json.dumps(entry, default=str) + "\n" for entry in spans)
+
+
+def prometheus_text() -> str:
+    with _lock:
+        totals = {k: tuple(v) for k, v in _span_totals.items()}
+        counters = dict(_counters)
+    lines = [
+        f"# HELP {METRIC_PREFIX}_span_seconds Time spent in instrumented hot paths.",
+        f"# TYPE {METRIC_PREFIX}_span_seconds summary",
+    ]
+    for name in sorted(totals):
+        seconds, calls = totals[name]
+        lines.append(f'{METRIC_PREFIX}_span_seconds_sum{{span="{name}"}} {seconds:.6f}')
+        lines.append(f'{METRIC_PREFIX}_span_seconds_count{{span="{name}"}} {calls}')
+    lines += [
+        f"# HELP {METRIC_PREFIX}_events_total Counted events (cache hits, downloads, ...).",
+        f"# TYPE {METRIC_PREFIX}_events_total counter",
+    ]
+    for name in sorted(counters):
+        lines.append(f'{METRIC_PREFIX}_events_total{{name="{name}"}} {counters[name]:g}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=PROM_PATH) -> None:
+    # For node_exporter's textfile collector: write then rename so scrapes never see half a file.
+    if not path:
+        return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def render_timing_panel(request=None) -> None:
+    # Optional debug expander listing this rerun's spans; pages show it behind a sidebar toggle.
+    import pandas as pd
+    import streamlit as st
+
+    request = request or current_request()
+    if request is None:
+        return
+    write_prometheus()
+    with st.expander(f"Timing breakdown ({request.elapsed():.2f}s this run)"):
+        if request.spans:
+            # Spans are recorded as they finish; list them in start order so nesting reads top-down.
+            spans = sorted(request.spans, key=lambda e: e.get("offset", 0.0))
+            rows = pd.DataFrame(
+                {
+                    "span": ["\u2003" * e["depth"] + e["span"] for e in spans],
+                    "start ms": [round(e.get("offset", 0.0) * 1000, 1) for e in spans],
+                    "ms": [round(e["seconds"] * 1000, 1) for e in spans],
+                    "error": [e.get("error", "") for e in spans],
+                }
+            )
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.write("No instrumented calls ran in this rerun.")
+        if request.counters:
+            st.write({k: v for k, v in sorted(request.counters.items())})
+        col1, col2 = st.columns(2)
+        col1.download_button("Spans (JSON lines)", to_jsonl(request.spans), file_name="spans.jsonl")
+        col2.download_button("Metrics (Prometheus)", prometheus_text(), file_name="metrics.prom")
@@ -0,0 +1,82 @@
+import io
+import os
+import multiprocessing as mp
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import context as mp_context, spawn, util
+
+# Start method for every worker process the app creates. Never a plain fork: the Streamlit
+# server and the forecast scheduler hold live yfinance (curl) sessions and threads, and a forked
+# child that garbage-collects an inherited curl handle hangs in its close(). Workers are spawned.
+#
+# A spawned child re-runs the parent's __main__ before its target. Streamlit runs each page as
+# __main__, so the child would execute the whole page again. Workers are told to initialise
+# __main__ from ENTRY_MODULE instead: importable, cheap, and the targets live in their own
+# modules anyway. Nothing in the parent (sys.modules included) is changed to do it.
+ENTRY_MODULE = __name__
+
+
+def _preparation_data(name):
+    data = spawn.get_preparation_data(name)
+    data.pop("init_main_from_path", None)
+    data["init_main_from_name"] = ENTRY_MODULE
+    return data
+
+
+if sys.platform != "win32":
+    from multiprocessing import popen_spawn_posix
+
+    class _Popen(popen_spawn_posix.Popen):
+        def _launch(self, process_obj):
+            # popen_spawn_posix.Popen._launch, with _preparation_data in place of the stdlib's.
+            from multiprocessing import resource_tracker
+            tracker_fd = resource_tracker.getfd()
+            self._fds.append(tracker_fd)
+            prep_data = _preparation_data(process_obj._name)
+            fp = io.BytesIO()
+            mp_context.set_spawning_popen(self)
+            try:
+                mp_context.reduction.dump(prep_data, fp)
+                mp_context.reduction.dump(process_obj, fp)
+            finally:
+                mp_context.set_spawning_popen(None)
+
+            parent_r = child_w = child_r = parent_w = None
+            try:
+                parent_r, child_w = os.pipe()
+                child_r, parent_w = os.pipe()
+                cmd = spawn.get_command_line(tracker_fd=tracker_fd, pipe_handle=child_r)
+                self._fds.extend([child_r, child_w])
+                self.pid = util.spawnv_passfds(spawn.get_executable(), cmd, self._fds)
+                self.sentinel = parent_r
+                with open(parent_w, "wb", closefd=False) as f:
+                    f.write(fp.getbuffer())
+            finally:
+                fds_to_close = [fd for fd in (parent_r, parent_w) if fd is not None]
+                self.finalizer = util.Finalize(self, util.close_fds, fds_to_close)
+                for fd in (child_r, child_w):
+                    if fd is not None:
+                        os.close(fd)
+
+    class WorkerProcess(mp_context.SpawnProcess):
+        @staticmethod
+        def _Popen(process_obj):
+            return _Popen(process_obj)
+
+    class _WorkerContext(mp_context.SpawnContext):
+        Process = WorkerProcess
+
+    _context = _WorkerContext()
+else:
+    # Windows decides the child's __main__ inside Popen.__init__; pages there keep the stdlib behaviour.
+    _context = mp.get_context("spawn")
+
+
+def worker_context():
+    return _context
+
+
+class WorkerPool(ProcessPoolExecutor):
+    # ProcessPoolExecutor on worker_context(); workers are started as tasks are submitted.
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers=max_workers, mp_context=worker_context())
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.utils import downsample
+from pages.utils.downsample import lttb, lttb_indices
+
+
+def _series(n, seed=0):
+    index = pd.date_range("2000-01-03", periods=n, freq="D")
+    return index, 100 + np.cumsum(np.random.default_rng(seed).standard_normal(n))
+
+
+# 5000/1000 points per bucket takes the NumPy path, 5000/300 the plain-Python one.
+@pytest.mark.parametrize("n, threshold", [(5000, 100), (5000, 300), (1001, 1000), (10, 3)])
+def test_lttb_keeps_the_ends_and_returns_threshold_points(n, threshold):
+    index, values = _series(n)
+    out_index, out_values = lttb(index, values, threshold)
+    assert len(out_index) == len(out_values) == threshold
+    assert out_index[0] == index[0] and out_index[-1] == index[-1]
+    assert out_values[0] == values[0] and out_values[-1] == values[-1]
+    assert out_index.is_monotonic_increasing and out_index.is_unique
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 50, 100])
+def test_short_input_is_returned_unchanged(n):
+    index, values = _series(n)
+    out_index, out_values = lttb(index, values, 100)
+    assert out_index.equals(index)
+    np.testing.assert_array_equal(out_values, values)
+
+
+def test_python_and_numpy_paths_pick_the_same_points(monkeypatch):
+    x, y = np.arange(3000.0), _series(3000, seed=1)[1]
+    python_path = lttb_indices(x, y, 200)
+    monkeypatch.setattr(downsample, "PYTHON_BUCKET_POINTS", 0)
+    np.testing.assert_array_equal(lttb_indices(x, y, 200), python_path)
+
+
+def test_warm_up_nans_are_dropped_before_downsampling():
+    index, values = _series(2000)
+    values[:50] = np.nan
+    out_index, out_values = lttb(index, values, 300)
+    assert len(out_values) == 300 and np.isfinite(out_values).all()
+    assert out_index[0] == index[50] and out_index[-1] == index[-1]
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from pages.utils.fetcher import Fetcher, FetchError
+
+
+def _bars(symbols):
+    index = pd.bdate_range("2025-01-01", periods=3, name="Date")
+    return pd.concat({s: pd.DataFrame({"Close": [1.0, 2.0, 3.0]}, index=index) for s in symbols}, axis=1)
+
+
+def _fetcher(source=None, source_many=None):
+    return Fetcher(source=source, source_many=source_many, sleep=lambda seconds: None)
+
+
+def test_failed_fetch_is_not_negative_cached():
+    def unreachable(symbol, start=None, period=None):
+        raise FetchError("curl: (6) Could not resolve host")
+
+    fetcher = _fetcher(source=unreachable)
+    assert fetcher.fetch("AAPL").empty
+    assert not fetcher.is_known_bad("AAPL")
+
+
+def test_empty_answer_is_negative_cached():
+    fetcher = _fetcher(source=lambda symbol, start=None, period=None: pd.DataFrame())
+    assert fetcher.fetch("NOPE").empty
+    assert fetcher.is_known_bad("NOPE")
+
+
+@pytest.mark.parametrize("failed", [None, ["MSFT"]])
+def test_fetch_many_only_blacklists_answered_symbols(failed):
+    def source_many(symbols, start=None, period=None):
+        if failed is None:
+            raise FetchError("Too Many Requests")
+        data = _bars(["AAPL"])
+        data.attrs["failed"] = failed
+        return data
+
+    fetcher = _fetcher(source_many=source_many)
+    frames = fetcher.fetch_many(["AAPL", "MSFT", "NOPE"])
+    assert list(frames) == ([] if failed is None else ["AAPL"])
+    assert not fetcher.is_known_bad("MSFT")
+    assert fetcher.is_known_bad("NOPE") == (failed is not None)
+
+
+def test_concurrent_callers_share_one_download():
+    callers = 8
+    arrived, release = threading.Barrier(callers + 1), threading.Event()
+    downloads = []
+
+    def slow_source(symbol, start=None, period=None):
+        downloads.append(symbol)
+        release.wait(5)
+        return _bars([symbol])[symbol]
+
+    fetcher = _fetcher(source=slow_source)
+    results = [None] * callers
+
+    def call(i):
+        arrived.wait(5)
+        results[i] = fetcher.fetch("AAPL")
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    arrived.wait(5)
+    # Hold the download open until every caller has either led it or joined it.
+    while fetcher.stats["requests"] < callers:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert downloads == ["AAPL"]
+    assert fetcher.stats["coalesced"] == callers - 1
+    assert all(result is results[0] for result in results)
+
+
+def test_backoff_delays_stay_within_bounds():
+    def unreachable(symbol, start=None, period=None):
+        raise FetchError("curl: (28) Timeout")
+
+    sleeps = []
+    fetcher = Fetcher(source=unreachable, max_attempts=8, base_delay=0.5, max_delay=4.0, sleep=sleeps.append)
+    for attempt in range(10):
+        for _ in range(200):
+            assert 0 <= fetcher._backoff(attempt) <= min(4.0, 0.5 * 2 ** attempt)
+
+    fetcher.fetch("AAPL")
+    assert len(sleeps) == 7
+    assert all(0 <= delay <= min(4.0, 0.5 * 2 ** attempt) for attempt, delay in enumerate(sleeps))
+
+
+def test_expired_entries_are_pruned():
+    now = [0.0]
+    fetcher = Fetcher(source=lambda symbol, start=None, period=None: pd.DataFrame(), negative_ttl=10.0,
+                      max_entries=3, sleep=lambda seconds: None, clock=lambda: now[0])
+    for symbol in ("A", "B", "C", "D"):
+        fetcher.fetch(symbol)
+    assert list(fetcher._bad_symbols) == ["B", "C", "D"]
+    now[0] = 11.0
+    fetcher.fetch("E")
+    assert list(fetcher._bad_symbols) == ["E"]
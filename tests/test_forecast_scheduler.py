@@ -0,0 +1,43 @@
+import pandas as pd
+from curl_cffi import requests as curl_requests
+
+from benchmarks.bench_hotpaths import synthetic_ohlcv
+from pages.utils import forecast_scheduler, forecast_store, price_store
+
+
+def test_materialize_with_live_sessions_in_parent(tmp_path, monkeypatch):
+    # Workers are started after the parent has opened curl sessions, like the scheduler does
+    # after its batched refresh; a forked child that inherits them can hang and time out.
+    prices, forecasts = tmp_path / "prices", tmp_path / "forecasts"
+    monkeypatch.setenv("PRICE_STORE_DIR", str(prices))
+    monkeypatch.setenv("PRICE_STORE_REFRESH_SECONDS", str(10 ** 9))
+    monkeypatch.setattr(price_store, "STORE_DIR", str(prices))
+    monkeypatch.setattr(forecast_store, "STORE_DIR", str(forecasts))
+
+    history = synthetic_ohlcv(400)
+    history.index = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=1), periods=400, name="Date")
+    price_store._write_prices("SYNTH", history)
+
+    sessions = []
+
+    def refresh_many(symbols, force=False):
+        sessions.extend(curl_requests.Session() for _ in symbols)
+        return {}
+
+    monkeypatch.setattr(forecast_scheduler, "refresh_many", refresh_many)
+    summary = forecast_scheduler.materialize(["SYNTH"], workers=1, timeout=120, order_mode="fixed", engine="state_space")
+
+    assert sessions
+    assert summary["ok"] == 1 and summary["timeouts"] == 0
+    stored = forecast_store.load_forecast("SYNTH", "fixed", "state_space")
+    assert stored is not None and len(stored["forecast"]) == 30
+
+
+def test_each_run_is_claimed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast_store, "STORE_DIR", str(tmp_path))
+    first = forecast_scheduler._claim_run("2026-01-05T16:30:00-05:00")
+    assert first is not None
+    assert forecast_scheduler._claim_run("2026-01-05T16:30:00-05:00") is None
+    forecast_scheduler._finish_run(first, "2026-01-05T16:30:00-05:00")
+    assert forecast_scheduler._claim_run("2026-01-05T16:30:00-05:00") is None
+    assert forecast_scheduler._claim_run("2026-01-06T16:30:00-05:00") is not None
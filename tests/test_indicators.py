@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.utils.indicators import ema, macd, rsi, sma, compute_indicators, compute_indicator_matrix, INDICATOR_COLUMNS
+from pages.utils.indicators import RSI_LENGTH, MACD_FAST, MACD_SLOW, MACD_SIGNAL
+from pages.utils.screener import _forward_fill
+
+# Reference definitions written directly against pandas' ewm/rolling (pandas_ta's defaults).
+LENGTHS = [0, 1, 5, MACD_FAST - 1, MACD_FAST, RSI_LENGTH, RSI_LENGTH + 1, MACD_SLOW, MACD_SLOW + MACD_SIGNAL - 1, 300]
+
+
+def _closes(n, seed=0):
+    return 100 + np.cumsum(np.random.default_rng(seed).standard_normal(n))
+
+
+def _ema_reference(series, length):
+    series = pd.Series(series, dtype=np.float64)
+    out = pd.Series(np.nan, index=series.index)
+    if len(series) >= length:
+        seeded = series.iloc[length - 1:].copy()
+        seeded.iloc[0] = series.iloc[:length].mean()
+        out.iloc[length - 1:] = seeded.ewm(span=length, adjust=False).mean()
+    return out.to_numpy()
+
+
+def _rsi_reference(series, length=RSI_LENGTH):
+    change = pd.Series(series, dtype=np.float64).diff()
+    gain = change.clip(lower=0).iloc[1:].ewm(alpha=1 / length, adjust=True, min_periods=length).mean()
+    loss = (-change).clip(lower=0).iloc[1:].ewm(alpha=1 / length, adjust=True, min_periods=length).mean()
+    return np.r_[np.nan, (100 * gain / (gain + loss)).to_numpy()][:len(series)]
+
+
+def _macd_reference(series):
+    line = _ema_reference(series, MACD_FAST) - _ema_reference(series, MACD_SLOW)
+    signal = np.full(line.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(line))
+    if len(valid):
+        signal[valid[0]:] = _ema_reference(line[valid[0]:], MACD_SIGNAL)
+    return line, signal, line - signal
+
+
+@pytest.mark.parametrize("n", LENGTHS)
+@pytest.mark.parametrize("length", [MACD_SIGNAL, MACD_FAST, MACD_SLOW])
+def test_ema_matches_pandas(n, length):
+    closes = _closes(n)
+    np.testing.assert_allclose(ema(closes, length), _ema_reference(closes, length), rtol=1e-10)
+
+
+@pytest.mark.parametrize("n", LENGTHS)
+def test_rsi_matches_pandas(n):
+    closes = _closes(n)
+    out = rsi(closes)
+    np.testing.assert_allclose(out, _rsi_reference(closes), rtol=1e-10)
+    # Warm-up: the first RSI_LENGTH closes have fewer than RSI_LENGTH changes behind them.
+    assert np.isnan(out[:RSI_LENGTH]).all()
+    assert np.isfinite(out[RSI_LENGTH:]).all()
+
+
+@pytest.mark.parametrize("n", LENGTHS)
+def test_macd_matches_pandas(n):
+    closes = _closes(n)
+    for ours, reference in zip(macd(closes), _macd_reference(closes)):
+        np.testing.assert_allclose(ours, reference, rtol=1e-10, atol=1e-12)
+    line, signal, _ = macd(closes)
+    assert np.isnan(line[:MACD_SLOW - 1]).all() and np.isfinite(line[MACD_SLOW - 1:]).all()
+    assert np.isfinite(signal).sum() == max(n - (MACD_SLOW + MACD_SIGNAL - 2), 0)
+
+
+@pytest.mark.parametrize("n", LENGTHS)
+def test_sma_matches_pandas(n):
+    closes = _closes(n)
+    np.testing.assert_allclose(sma(closes, 50), pd.Series(closes).rolling(50).mean().to_numpy(), rtol=1e-10)
+
+
+def test_flat_series_has_no_rsi():
+    # No gains and no losses: RSI is undefined rather than 0 or 100.
+    assert np.isnan(compute_indicators(np.full(60, 10.0))["RSI"]).all()
+
+
+def test_matrix_rows_match_single_ticker_indicators():
+    # Tickers listed at different times (NaN prefix), one too short to warm up, and missing bars
+    # forward-filled the way the screener does before computing.
+    n = 320
+    rows = [_closes(n, seed) for seed in range(6)]
+    rows[1][:120] = np.nan
+    rows[2][:n - 30] = np.nan
+    rows[3][:n - 5] = np.nan
+    rows[4][[50, 51, 52, 200, 301]] = np.nan
+    rows[5][:70] = np.nan
+    rows[5][150:160] = np.nan
+    matrix = _forward_fill(np.vstack(rows))
+
+    fields = compute_indicator_matrix(matrix)
+    for row, series in enumerate(matrix):
+        start = int(np.argmax(~np.isnan(series)))
+        single = compute_indicators(series[start:])
+        for name in INDICATOR_COLUMNS:
+            expected = np.r_[np.full(start, np.nan), single[name]]
+            np.testing.assert_allclose(fields[name][row], expected, rtol=1e-9, atol=1e-9, err_msg=f"row {row} {name}")
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pages.utils import tracing
+from pages.utils.forecast_updater import update_forecast
+from pages.utils.model_train import compare_engines, evaluate_and_forecast, evaluate_model, simulate_results, INTERVAL_LEVELS
+
+
+def test_compare_engines_is_memoized():
+    series = np.cumsum(np.random.default_rng(0).standard_normal(200))
+    engines = ("ets", "linear_ar")
+    first = compare_engines(series, 1, "SYNTH", engines=engines)
+    assert compare_engines(series, 1, "SYNTH", engines=engines) is first
+
+
+@pytest.mark.parametrize("engine", ["state_space", "ets", "linear_ar"])
+def test_evaluate_and_forecast_fits_once(engine):
+    series = np.cumsum(np.random.default_rng(1).standard_normal(300))
+    counter = "arima_fits" if engine == "state_space" else f"{engine}_fits"
+    before = tracing._counters[counter]
+    rmse, forecast = evaluate_and_forecast(series, 1, f"ONCE-{engine}", engine=engine, steps=10, levels=INTERVAL_LEVELS)
+    assert tracing._counters[counter] - before == 1
+    assert rmse == evaluate_model(series, 1, f"ONCE-{engine}", engine=engine)
+    assert len(forecast) == 10 and forecast.notna().all().all()
+    assert (forecast["Upper 95%"] > forecast["Close"]).all()
+
+
+def test_simulated_paths_match_the_forecast_bands():
+    closes = 100 + np.cumsum(np.random.default_rng(2).standard_normal(300))
+    close_price = pd.DataFrame({"Close": closes}, index=pd.bdate_range("2024-01-01", periods=300))
+    update = update_forecast("SIM", close_price, (1, 1, 1), steps=30, levels=INTERVAL_LEVELS)
+    before = tracing._counters["arima_fits"]
+    paths = simulate_results(update["results"], "SIM", steps=30, n_paths=4000)
+    assert tracing._counters["arima_fits"] == before
+    prices = paths * update["scaler"].scale_[0] + update["scaler"].mean_[0]
+    forecast = update["forecast"]
+    # 95% band vs the simulated 2.5th/97.5th percentiles, up to Monte-Carlo error.
+    lower, upper = np.percentile(prices, [2.5, 97.5], axis=0)
+    width = (forecast["Upper 95%"] - forecast["Lower 95%"]).to_numpy()
+    np.testing.assert_allclose(upper - lower, width, rtol=0.1)
+    np.testing.assert_allclose(np.median(prices, axis=0), forecast["Close"].to_numpy(), atol=0.1 * width.max())
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from pages.utils.plotly_figure import STREAM_TRACES, stream_figures, extend_stream_figures, forecast_comparison
+from pages.utils.streaming import STREAM_COLUMNS, TickerStream
+
+
+def _minute_bars(n):
+    index = pd.date_range("2026-01-05 09:30", periods=n, freq="min", name="Datetime")
+    close = 100 + np.cumsum(np.random.default_rng(0).standard_normal(n))
+    return pd.DataFrame({"Open": close, "High": close + 0.5, "Low": close - 0.5, "Close": close,
+                         "Volume": 1000.0}, index=index)
+
+
+def test_stream_traces_fill_up_to_the_window():
+    window, bars = 40, _minute_bars(100)
+    stream = TickerStream("SYNTH", window)
+    stream.push(bars.iloc[:5])
+    figures = stream_figures(stream.frame())
+    for end in range(6, len(bars) + 1):
+        rows = stream.push(bars.iloc[end - 1:end])
+        extend_stream_figures(figures, rows, window, STREAM_COLUMNS)
+        expected = min(end, window)
+        for name in STREAM_TRACES:
+            for trace in figures[name].data:
+                assert len(trace.x) == len(trace.y) == expected
+    last = figures["price"].data[0]
+    np.testing.assert_array_equal(np.asarray(last.y), bars["Close"].to_numpy()[-window:])
+    # Same epoch-millisecond x values as the figures built in one go.
+    np.testing.assert_array_equal(np.asarray(last.x), stream_figures(stream.frame())["price"].data[0].x)
+
+
+def test_forecast_comparison_marks_the_horizons():
+    dates = pd.bdate_range("2026-01-05", periods=20)
+    paths = pd.DataFrame({"AAA": np.linspace(0, 2, 20), "BBB": np.linspace(0, -1, 20)}, index=dates)
+    fig = forecast_comparison(paths, horizons=(5, 20, 60))
+    assert [trace.name for trace in fig.data] == ["AAA", "BBB"]
+    assert fig.data[0].x.dtype == np.float64
+    expected = dates[[4, 19]].as_unit("ms").asi8.astype(np.float64)
+    assert [shape.x0 for shape in fig.layout.shapes] == list(expected)
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pages.utils.shared_prices import append_prices, last_completed_session, read_prices
+
+
+def _daily_bars(end, n=5, base=100.0):
+    index = pd.bdate_range(end=end, periods=n, name="Date")
+    close = base + np.arange(n, dtype=np.float64)
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000}, index=index)
+
+
+def test_session_is_written_once_it_has_closed(tmp_path):
+    bars = _daily_bars("2026-03-06")                      # Monday to Friday
+    friday = pd.Timestamp("2026-03-06")
+    assert last_completed_session("2026-03-06 15:59") == friday - pd.Timedelta(days=1)
+    assert last_completed_session("2026-03-06 16:30") == friday
+    # Market time, whatever zone the writer's clock is in: 21:30 UTC is 16:30 in New York.
+    assert last_completed_session(pd.Timestamp("2026-03-06 21:30", tz="UTC")) == friday
+
+    assert append_prices("AAA", bars, tmp_path, now="2026-03-06 12:00") == 4
+    assert append_prices("AAA", bars, tmp_path, now="2026-03-06 16:30") == 1
+    assert read_prices("AAA", directory=tmp_path).index[-1] == friday
+
+
+def test_rebuilt_file_with_the_same_rows_is_remapped(tmp_path):
+    bars = _daily_bars("2026-03-06")
+    append_prices("AAA", bars, tmp_path, now="2026-03-07")
+    assert read_prices("AAA", directory=tmp_path)["Close"].iloc[-1] == 104.0
+
+    # A rebuild lands with os.replace: new file, same row count.
+    append_prices("AAA", _daily_bars("2026-03-06", base=200.0), tmp_path / "rebuild", now="2026-03-07")
+    os.replace(tmp_path / "rebuild" / "AAA.bars", tmp_path / "AAA.bars")
+    assert read_prices("AAA", directory=tmp_path)["Close"].iloc[-1] == 204.0
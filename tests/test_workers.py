@@ -0,0 +1,16 @@
+import sys
+
+from pages.utils.workers import WorkerPool, ENTRY_MODULE
+
+
+def _main_module_name():
+    return sys.modules["__main__"].__spec__.name
+
+
+def test_workers_take_the_entry_module_as_main():
+    # A worker must not re-run the parent's __main__ (a Streamlit page), and starting one must
+    # not touch the parent's sys.modules.
+    main = sys.modules["__main__"]
+    with WorkerPool(max_workers=1) as pool:
+        assert pool.submit(_main_module_name).result(timeout=60) == ENTRY_MODULE
+    assert sys.modules["__main__"] is main